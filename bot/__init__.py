@@ -1,12 +1,11 @@
-from os import path as ospath, mkdir, system, getenv
+from os import path as ospath, mkdir, system, getenv, environ
 from logging import INFO, ERROR, FileHandler, StreamHandler, basicConfig, getLogger
 from traceback import format_exc
-from asyncio import Queue, Lock
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from pyrogram import Client
 from pyrogram.enums import ParseMode
-from dotenv import load_dotenv
+from dotenv import dotenv_values
 from uvloop import install
 
 install()
@@ -18,50 +17,110 @@ basicConfig(format="[%(asctime)s] [%(name)s | %(levelname)s] - %(message)s [%(fi
 getLogger("pyrogram").setLevel(ERROR)
 LOGS = getLogger(__name__)
 
-load_dotenv('config.env')
+base_env = dict(environ)
+env_keys = set()
+
+def apply_config_env():
+    """Applies config.env below the process environment like at startup, keys since removed from it are unset."""
+    values = {key: value for key, value in dotenv_values('config.env').items() if value is not None and key not in base_env}
+    for key in env_keys - set(values):
+        environ.pop(key, None)
+    environ.update(values)
+    env_keys.clear()
+    env_keys.update(values)
+
+apply_config_env()
 
 ani_cache = {
-    'fetch_animes': True,
-    'ongoing': set(),
-    'completed': set()
+    'fetch_animes': True
 }
 ffpids_cache = list()
 
-ffLock = Lock()
-ffQueue = Queue()
-ff_queued = dict()
-
-class Var:
-    API_ID, API_HASH, BOT_TOKEN = getenv("API_ID"), getenv("API_HASH"), getenv("BOT_TOKEN")
-    MONGO_URI = getenv("MONGO_URI")
+def load_vars():
+    """Builds Var from the environment, config.env only fills in what it does not set."""
+    class Var:
+        API_ID, API_HASH, BOT_TOKEN = getenv("API_ID"), getenv("API_HASH"), getenv("BOT_TOKEN")
+        MONGO_URI = getenv("MONGO_URI")
     
-    if not BOT_TOKEN or not API_HASH or not API_ID or not MONGO_URI:
-        LOGS.critical('Important Variables Missing. Fill Up and Retry..!! Exiting Now...')
-        exit(1)
+        if not BOT_TOKEN or not API_HASH or not API_ID or not MONGO_URI:
+            LOGS.critical('Important Variables Missing. Fill Up and Retry..!! Exiting Now...')
+            exit(1)
 
-    RSS_ITEMS = getenv("RSS_ITEMS", "https://subsplease.org/rss/?r=1080").split()
-    FSUB_CHATS = list(map(int, getenv('FSUB_CHATS').split()))
-    BACKUP_CHANNEL = getenv("BACKUP_CHANNEL") or ""
-    MAIN_CHANNEL = int(getenv("MAIN_CHANNEL"))
-    LOG_CHANNEL = int(getenv("LOG_CHANNEL") or 0)
-    FILE_STORE = int(getenv("FILE_STORE"))
-    ADMINS = list(map(int, getenv("ADMINS", "1242011540").split()))
+        RSS_ITEMS = getenv("RSS_ITEMS", "https://subsplease.org/rss/?r=1080").split()
+        FSUB_CHATS = list(map(int, getenv('FSUB_CHATS').split()))
+        BACKUP_CHANNEL = getenv("BACKUP_CHANNEL") or ""
+        MAIN_CHANNEL = int(getenv("MAIN_CHANNEL"))
+        LOG_CHANNEL = int(getenv("LOG_CHANNEL") or 0)
+        FILE_STORE = int(getenv("FILE_STORE"))
+        ADMINS = list(map(int, getenv("ADMINS", "1242011540").split()))
     
-    SEND_SCHEDULE = getenv("SEND_SCHEDULE", "False").lower() == "true"
-    BRAND_UNAME = getenv("BRAND_UNAME", "@username")
-    FFCODE_1080 = getenv("FFCODE_1080") or """ffmpeg -i '{}' -progress '{}' -preset veryfast -c:v libx264 -s 1920x1080 -pix_fmt yuv420p -crf 30 -c:a libopus -b:a 32k -c:s copy -map 0 -ac 2 -ab 32k -vbr 2 -level 3.1 '{}' -y"""
-    FFCODE_720 = getenv("FFCODE_720") or """ffmpeg -i '{}' -progress '{}' -preset superfast -c:v libx264 -s 1280x720 -pix_fmt yuv420p -crf 30 -c:a libopus -b:a 32k -c:s copy -map 0 -ac 2 -ab 32k -vbr 2 -level 3.1 '{}' -y"""
-    FFCODE_480 = getenv("FFCODE_480") or """ffmpeg -i '{}' -progress '{}' -preset superfast -c:v libx264 -s 854x480 -pix_fmt yuv420p -crf 30 -c:a libopus -b:a 32k -c:s copy -map 0 -ac 2 -ab 32k -vbr 2 -level 3.1 '{}' -y"""
-    FFCODE_Hdrip = getenv("FFCODE_Hdrip") or """ffmpeg -i '{}' -progress '{}' -preset superfast -c:v libx264 -s 640x360 -pix_fmt yuv420p -crf 30 -c:a libopus -b:a 32k -c:s copy -map 0 -ac 2 -ab 32k -vbr 2 -level 3.1 '{}' -y"""
-    QUALS = getenv("QUALS", "Hdrip 480 720 1080").split()
+        SEND_SCHEDULE = getenv("SEND_SCHEDULE", "False").lower() == "true"
+        SHDR_WORKERS = int(getenv("SHDR_WORKERS", "8"))
+        BRAND_UNAME = getenv("BRAND_UNAME", "@username")
+        FFCODE_1080 = getenv("FFCODE_1080") or """ffmpeg -i '{}' -progress '{}' -preset veryfast -c:v libx264 -s 1920x1080 -pix_fmt yuv420p -crf 30 -c:a libopus -b:a 32k -c:s copy -map 0 -ac 2 -ab 32k -vbr 2 -level 3.1 '{}' -y"""
+        FFCODE_720 = getenv("FFCODE_720") or """ffmpeg -i '{}' -progress '{}' -preset superfast -c:v libx264 -s 1280x720 -pix_fmt yuv420p -crf 30 -c:a libopus -b:a 32k -c:s copy -map 0 -ac 2 -ab 32k -vbr 2 -level 3.1 '{}' -y"""
+        FFCODE_480 = getenv("FFCODE_480") or """ffmpeg -i '{}' -progress '{}' -preset superfast -c:v libx264 -s 854x480 -pix_fmt yuv420p -crf 30 -c:a libopus -b:a 32k -c:s copy -map 0 -ac 2 -ab 32k -vbr 2 -level 3.1 '{}' -y"""
+        FFCODE_Hdrip = getenv("FFCODE_Hdrip") or """ffmpeg -i '{}' -progress '{}' -preset superfast -c:v libx264 -s 640x360 -pix_fmt yuv420p -crf 30 -c:a libopus -b:a 32k -c:s copy -map 0 -ac 2 -ab 32k -vbr 2 -level 3.1 '{}' -y"""
+        QUALS = getenv("QUALS", "Hdrip 480 720 1080").split()
+        MULTI_ENCODE = getenv("MULTI_ENCODE", "False").lower() == "true"
+        FF_SLOTS = int(getenv("FF_SLOTS", "0"))
+        FF_THREADS = int(getenv("FF_THREADS", "4"))
+        FF_COSTS = getenv("FF_COSTS", "1080:1 720:0.6 480:0.35 Hdrip:0.25")
+        BENCH_PRESETS = getenv("BENCH_PRESETS", "ultrafast superfast veryfast")
+        BENCH_CRFS = getenv("BENCH_CRFS", "")
+        BENCH_SECS = int(getenv("BENCH_SECS", "20"))
+        BENCH_TARGETS = getenv("BENCH_TARGETS", "1080:350 720:200 480:120 Hdrip:90")
+        ARIA2_PORT = int(getenv("ARIA2_PORT", "6800"))
+        ARIA2_SECRET = getenv("ARIA2_SECRET", "")
+        ARIA2_MAX_DL = int(getenv("ARIA2_MAX_DL", "3"))
+        DL_WORKERS = int(getenv("DL_WORKERS", "2"))
+        DL_QUEUE = int(getenv("DL_QUEUE", "16"))
+        FF_QUEUE = int(getenv("FF_QUEUE", "2"))
+        UP_QUEUE = int(getenv("UP_QUEUE", "4"))
+        UPLOAD_TOKENS = getenv("UPLOAD_TOKENS", "").split()
+        STREAM_ENCODE = getenv("STREAM_ENCODE", "False").lower() == "true"
+        STREAM_HEAD = getenv("STREAM_HEAD", "64M")
+        STREAM_STALL = int(getenv("STREAM_STALL", "90"))
     
-    AS_DOC = getenv("AS_DOC", "True").lower() == "true"
-    THUMB = getenv("THUMB", "https://te.legra.ph/file/621c8d40f9788a1db7753.jpg")
-    AUTO_DEL = getenv("AUTO_DEL", "True").lower() == "true"
-    DEL_TIMER = int(getenv("DEL_TIMER", "600"))
-    START_PHOTO = getenv("START_PHOTO", "https://te.legra.ph/file/120de4dbad87fb20ab862.jpg")
-    START_MSG = getenv("START_MSG", "<b>Hey {first_name}</b>,\n\n    <i>I am Auto Animes Store & Automater Encoder Build with ❤️ !!</i>")
-    START_BUTTONS = getenv("START_BUTTONS", "UPDATES|https://telegram.me/Matiz_Tech SUPPORT|https://t.me/+p78fp4UzfNwzYzQ5")
+        ANI_CACHE_SIZE = int(getenv("ANI_CACHE_SIZE", "512"))
+        ANI_STABLE_TTL = int(getenv("ANI_STABLE_TTL", str(7 * 24 * 3600)))
+        ANI_VOLATILE_TTL = int(getenv("ANI_VOLATILE_TTL", str(6 * 3600)))
+        ANI_RATE = int(getenv("ANI_RATE", "30"))
+        EP_CACHE_SIZE = int(getenv("EP_CACHE_SIZE", "2048"))
+        TG_RATE = int(getenv("TG_RATE", "25"))
+        TG_CHAT_RATE = int(getenv("TG_CHAT_RATE", "20"))
+        REPORT_INTERVAL = int(getenv("REPORT_INTERVAL", "10"))
+        REPORT_QUEUE = int(getenv("REPORT_QUEUE", "200"))
+        DELIVERY_CACHE = int(getenv("DELIVERY_CACHE", "4096"))
+        FSUB_TTL = int(getenv("FSUB_TTL", "600"))
+    
+        AS_DOC = getenv("AS_DOC", "True").lower() == "true"
+        THUMB = getenv("THUMB", "https://te.legra.ph/file/621c8d40f9788a1db7753.jpg")
+        AUTO_DEL = getenv("AUTO_DEL", "True").lower() == "true"
+        DEL_TIMER = int(getenv("DEL_TIMER", "600"))
+        START_PHOTO = getenv("START_PHOTO", "https://te.legra.ph/file/120de4dbad87fb20ab862.jpg")
+        START_MSG = getenv("START_MSG", "<b>Hey {first_name}</b>,\n\n    <i>I am Auto Animes Store & Automater Encoder Build with ❤️ !!</i>")
+        START_BUTTONS = getenv("START_BUTTONS", "UPDATES|https://telegram.me/Matiz_Tech SUPPORT|https://t.me/+p78fp4UzfNwzYzQ5")
+    return Var
+
+Var = load_vars()
+
+def reload_vars():
+    """Re-reads config.env into Var in place and returns the changed names, lists are updated in place so holders of them see the change."""
+    apply_config_env()
+    try:
+        fresh, changed = load_vars(), []
+    except SystemExit:
+        raise ValueError("Important Variables Missing in config.env")
+    for key, value in vars(fresh).items():
+        if key.startswith('__') or (old := getattr(Var, key, None)) == value:
+            continue
+        changed.append(key)
+        if isinstance(old, list) and isinstance(value, list):
+            old[:] = value
+        else:
+            setattr(Var, key, value)
+    return changed
 
 if Var.THUMB and not ospath.exists("thumb.jpg"):
     system(f"wget -q {Var.THUMB} -O thumb.jpg")
@@ -1,23 +1,36 @@
 from asyncio import create_task, create_subprocess_exec, create_subprocess_shell, run as asyrun, all_tasks, gather, sleep as asleep
 from aiofiles import open as aiopen
 from pyrogram import idle
-from pyrogram.filters import command, user
+from pyrogram.filters import command
 from os import path as ospath, execl, kill
 from sys import executable
 from signal import SIGKILL
 
-from bot import bot, Var, bot_loop, sch, LOGS, ffQueue, ffLock, ffpids_cache, ff_queued
+from bot import bot, Var, bot_loop, sch, LOGS, ffpids_cache
 from bot.core.auto_animes import fetch_animes
-from bot.core.func_utils import clean_up, new_task, editMessage
+from bot.core.pipeline import pipeline
+from bot.core.benchmark import load_tuned
+from bot.core.aria2 import aria2
+from bot.core.episode_store import epstore
+from bot.core.auto_delete import autodel
+from bot.core.upload_pool import uppool
+from bot.core.routing import router
+from bot.core.journal import journal
+from bot.core.reporter import rep
+from bot.core.func_utils import admins, clean_up, new_task, editMessage
 from bot.modules.up_posts import upcoming_animes
 
-@bot.on_message(command('restart') & user(Var.ADMINS))
+@bot.on_message(command('restart') & admins)
 @new_task
 async def restart(client, message):
     rmessage = await message.reply('<i>Restarting...</i>')
     if sch.running:
         sch.shutdown(wait=False)
-    await clean_up()
+    await epstore.flush()
+    await autodel.flush()
+    await rep.flush()
+    # Journaled jobs resume after the restart, their workspaces must survive it
+    await clean_up(keep=[doc['_id'] for doc in await journal.pending()])
     if len(ffpids_cache) != 0: 
         for pid in ffpids_cache:
             try:
@@ -40,32 +53,32 @@ async def restart():
         except Exception as e:
             LOGS.error(e)
             
-async def queue_loop():
-    LOGS.info("Queue Loop Started !!")
-    while True:
-        if not ffQueue.empty():
-            post_id = await ffQueue.get()
-            await asleep(1.5)
-            ff_queued[post_id].set()
-            await asleep(1.5)
-            async with ffLock:
-                ffQueue.task_done()
-        await asleep(10)
-
 async def main():
     sch.add_job(upcoming_animes, "cron", hour=0, minute=30)
     await bot.start()
     await restart()
+    await load_tuned()
+    await epstore.warm()
+    await autodel.start()
+    await router.load()
+    await aria2.start()
+    await uppool.start()
     LOGS.info('Auto Anime Bot Started!')
     sch.start()
-    bot_loop.create_task(queue_loop())
+    pipeline.start()
+    await pipeline.resume()
     await fetch_animes()
     await idle()
     LOGS.info('Auto Anime Bot Stopped!')
+    await epstore.flush()
+    await autodel.flush()
+    await rep.flush()
+    await aria2.stop()
+    await uppool.stop()
     await bot.stop()
     for task in all_tasks:
         task.cancel()
-    await clean_up()
+    await clean_up(keep=[doc['_id'] for doc in await journal.pending()])
     LOGS.info('Finished AutoCleanUp !!')
     
 if __name__ == '__main__':
@@ -0,0 +1,69 @@
+from re import findall
+from time import time
+from traceback import format_exc
+
+from bot import Var, LOGS
+from .cache_utils import LRUCache
+from .database import db
+
+def normalize_name(name):
+    return " ".join(findall(r"\w+", str(name).lower()))
+
+class AniListCache:
+    def __init__(self, maxsize, stable_ttl, volatile_ttl):
+        self.__ids = LRUCache(maxsize)
+        self.__names = LRUCache(maxsize * 4)
+        self.stable_ttl = stable_ttl
+        self.volatile_ttl = volatile_ttl
+
+    def __state(self, entry):
+        """Returns (stable_fresh, volatile_fresh) for a cache entry."""
+        now = time()
+        return now - entry['stable_at'] < self.stable_ttl, now - entry['volatile_at'] < self.volatile_ttl
+
+    async def __load(self, key=None, ani_id=None):
+        if ani_id is None:
+            ani_id = self.__names.get(key)
+        if ani_id is not None and (entry := self.__ids.get(ani_id)):
+            return entry
+        try:
+            entry = await db.getAniData(name=key if ani_id is None else None, ani_id=ani_id)
+        except Exception:
+            LOGS.error(format_exc())
+            return None
+        if entry:
+            self.__ids.set(entry['_id'], entry)
+            if key:
+                self.__names.set(key, entry['_id'])
+        return entry
+
+    async def get(self, name=None, ani_id=None):
+        """Returns (data, needs_refresh) or (None, True) if nothing usable is cached."""
+        entry = await self.__load(normalize_name(name) if name else None, ani_id)
+        if not entry:
+            return None, True
+        stable, volatile = self.__state(entry)
+        if not stable:
+            return None, True
+        return entry['data'], not volatile
+
+    async def put(self, name, data, volatile_only=False):
+        if not data or not (ani_id := data.get('id')):
+            return
+        now = time()
+        # Only the name that was queried is indexed, a sequel's synonyms often repeat the base title
+        key = normalize_name(name) if name else ""
+        entry = self.__ids.get(ani_id) or {'_id': ani_id, 'stable_at': now, 'queries': []}
+        if not volatile_only:
+            entry['stable_at'] = now
+        entry.update({'data': data, 'volatile_at': now, 'queries': sorted({key, *entry.get('queries', [])} - {''})})
+        entry.pop('names', None)
+        self.__ids.set(ani_id, entry)
+        if key:
+            self.__names.set(key, ani_id)
+        try:
+            await db.saveAniData(entry, key)
+        except Exception:
+            LOGS.error(format_exc())
+
+anicache = AniListCache(Var.ANI_CACHE_SIZE, Var.ANI_STABLE_TTL, Var.ANI_VOLATILE_TTL)
@@ -0,0 +1,140 @@
+from base64 import b64encode
+from itertools import count
+from hashlib import sha256
+from os import path as ospath, makedirs
+from asyncio import Lock, create_subprocess_exec, sleep as asleep
+from asyncio.subprocess import DEVNULL
+from aiofiles import open as aiopen
+from aiohttp import ClientSession, ClientError
+
+from bot import Var, LOGS
+
+ARIA2_DIR = ".aria2"
+
+class Aria2Error(Exception):
+    pass
+
+class Aria2Daemon:
+    def __init__(self, port, secret=None, max_downloads=3):
+        self.__port = port
+        self.__url = f"http://127.0.0.1:{port}/jsonrpc"
+        self.__secret = secret or sha256(Var.BOT_TOKEN.encode()).hexdigest()[:32]
+        self.__max_dl = max_downloads
+        self.__proc = None
+        self.__ready = False
+        self.__ids = count(1)
+        self.__lock = Lock()
+
+    @property
+    def running(self):
+        return self.__ready and (self.__proc is None or self.__proc.returncode is None)
+
+    async def start(self):
+        async with self.__lock:
+            if self.running:
+                return
+            try:
+                # A daemon left over from an in-place restart keeps its warm DHT state, so reuse it
+                version = await self.__request("getVersion")
+                self.__ready = True
+                LOGS.info(f"Aria2 RPC Daemon Attached : v{version.get('version')} on Port {self.__port}")
+                return
+            except (ClientError, OSError, Aria2Error):
+                pass
+            makedirs(ARIA2_DIR, exist_ok=True)
+            dht_file = ospath.join(ARIA2_DIR, "dht.dat")
+            command = [
+                "aria2c",
+                "--enable-rpc=true",
+                "--rpc-listen-all=false",
+                f"--rpc-listen-port={self.__port}",
+                f"--rpc-secret={self.__secret}",
+                f"--max-concurrent-downloads={self.__max_dl}",
+                "--dir=downloads",
+                "--seed-time=0",
+                "--max-connection-per-server=16",
+                "--split=16",
+                "--bt-max-peers=500",
+                "--bt-tracker-connect-timeout=5",
+                "--bt-tracker-timeout=5",
+                "--bt-tracker=udp://tracker.openbittorrent.com:80/announce",
+                "--enable-dht=true",
+                f"--dht-file-path={dht_file}",
+                "--bt-enable-lpd=true",
+                "--follow-torrent=mem",
+                "--continue=true",
+                "--allow-overwrite=true",
+                "--file-allocation=none",
+                "--summary-interval=0",
+                "--quiet=true",
+            ]
+            # Kept out of ffpids_cache, /restart kills those but this daemon is meant to outlive the execl
+            self.__proc = await create_subprocess_exec(*command, stdout=DEVNULL, stderr=DEVNULL)
+            for _ in range(50):
+                try:
+                    version = await self.__request("getVersion")
+                    self.__ready = True
+                    LOGS.info(f"Aria2 RPC Daemon Started : v{version.get('version')} on Port {self.__port}")
+                    return
+                except (ClientError, OSError):
+                    await asleep(0.2)
+            raise Aria2Error("Aria2 RPC Daemon did not Start")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self.__ready = False
+        try:
+            await self.__request("shutdown")
+        except Exception:
+            if self.__proc is not None:
+                self.__proc.kill()
+        if self.__proc is not None:
+            await self.__proc.wait()
+
+    async def __request(self, method, *params):
+        payload = {'jsonrpc': '2.0', 'id': next(self.__ids), 'method': f"aria2.{method}",
+                   'params': [f"token:{self.__secret}", *params]}
+        async with ClientSession() as sess:
+            async with sess.post(self.__url, json=payload) as resp:
+                data = await resp.json(content_type=None)
+        if 'error' in data:
+            raise Aria2Error(data['error'].get('message'))
+        return data.get('result')
+
+    async def call(self, method, *params):
+        if not self.running:
+            await self.start()
+        return await self.__request(method, *params)
+
+    async def add_uri(self, uri, options=None):
+        return await self.call("addUri", [uri], options or {})
+
+    async def add_torrent(self, path, options=None):
+        async with aiopen(path, 'rb') as f:
+            content = b64encode(await f.read()).decode()
+        return await self.call("addTorrent", content, [], options or {})
+
+    async def status(self, gid, keys=None):
+        return await self.call("tellStatus", gid, keys) if keys else await self.call("tellStatus", gid)
+
+    async def find(self, info_hash):
+        """Status of a download of the given torrent the daemon already holds, None if there is none."""
+        keys = ['gid', 'status', 'infoHash', 'dir']
+        for method, *params in (("tellActive",), ("tellWaiting", 0, 1000), ("tellStopped", 0, 1000)):
+            for status in await self.call(method, *params, keys):
+                if status.get('infoHash', '').lower() == info_hash.lower():
+                    return status
+        return None
+
+    async def remove(self, gid):
+        try:
+            await self.call("forceRemove", gid)
+        except Aria2Error:
+            pass
+        try:
+            await self.call("removeDownloadResult", gid)
+        except Aria2Error:
+            pass
+
+aria2 = Aria2Daemon(Var.ARIA2_PORT, Var.ARIA2_SECRET, Var.ARIA2_MAX_DL)
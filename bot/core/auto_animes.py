@@ -1,136 +1,74 @@
-from asyncio import gather, create_task, sleep as asleep, Event
+from asyncio import gather, create_task, sleep as asleep
 from asyncio.subprocess import PIPE
 from os import path as ospath, system
 from aiofiles import open as aiopen
 from aiofiles.os import remove as aioremove
 from traceback import format_exc
 from base64 import urlsafe_b64encode
+from functools import partial
 from time import time
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from bot.modules import separate_channel
-from bot import bot, bot_loop, Var, ani_cache, ffQueue, ffLock, ff_queued
-from .tordownload import TorDownloader
-from .database import db
-from .func_utils import getfeed, encode, editMessage, sendMessage, convertBytes
+from bot import bot, bot_loop, Var, ani_cache
+from .episode_store import epstore
+from .feed_poller import poller
+from .func_utils import encode, editMessage, sendMessage, convertBytes
 from .text_utils import TextEditor
-from .ffencoder import FFEncoder
-from .tguploader import TgUploader
+from .pipeline import pipeline, AnimeJob
+from .msg_scheduler import msgsch
 from .reporter import rep
 
-btn_formatter = {
-    '1080':'ⓉⓌ•1080p', 
-    '720':'ⓉⓌ•720p',
-    '480':'ⓉⓌ•480p',
-    'Hdrip':'ⓉⓌ•HDRip'
-}
-
 async def fetch_animes():
     await rep.report("Fetch Animes Started !!", "info")
     while True:
         await asleep(60)
         if ani_cache['fetch_animes']:
-            for link in Var.RSS_ITEMS:
-                if (info := await getfeed(link, 0)):
-                    bot_loop.create_task(get_animes(info.title, info.link))
+            for info in await poller.poll():
+                bot_loop.create_task(get_animes(info.title, info.link, guid=poller.get_guid(info)))
 
-async def get_animes(name, torrent, force=False):
+async def get_animes(name, torrent, force=False, guid=None):
+    handled = False
     try:
         aniInfo = TextEditor(name)
         await aniInfo.load_anilist()
         ani_id, ep_no = aniInfo.adata.get('id'), aniInfo.pdata.get("episode_number")
-        if ani_id not in ani_cache['ongoing']:
-            ani_cache['ongoing'].add(ani_id)
-        elif not force:
-            return
-        if not force and ani_id in ani_cache['completed']:
+        if not (claimed := epstore.claim(ani_id, ep_no)) and not force:
+            # Another task already holds this episode
+            handled = True
             return
-        if force or (not (ani_data := await db.getAnime(ani_id)) \
-            or (ani_data and not (qual_data := ani_data.get(ep_no))) \
-            or (ani_data and qual_data and not all(qual for qual in qual_data.values()))):
-            
-            if "[Batch]" in name:
-                await rep.report(f"Torrent Skipped!\n\n{name}", "warning")
-                return
-            
-            await rep.report(f"New Anime Torrent Found!\n\n{name}", "info")
-            post_msg = await bot.send_photo(
-                Var.MAIN_CHANNEL,
-                photo=await aniInfo.get_poster(),
-                caption=await aniInfo.get_caption()
-            )
-            #post_msg = await sendMessage(Var.MAIN_CHANNEL, (await aniInfo.get_caption()).format(await aniInfo.get_poster()), invert_media=True)
-            
-            await asleep(1.5)
-            stat_msg = await sendMessage(Var.MAIN_CHANNEL, f"‣ <b>Anime Name :</b> <b><i>{name}</i></b>\n\n<i>Downloading...</i>")
-            dl = await TorDownloader("./downloads").download(torrent, name)
-            if not dl or not ospath.exists(dl):
-                await rep.report(f"File Download Incomplete, Try Again", "error")
-                await stat_msg.delete()
-                return
+        submitted = False
+        try:
+            if force or not await epstore.is_done(ani_id, ep_no):
 
-            post_id = post_msg.id
-            ffEvent = Event()
-            ff_queued[post_id] = ffEvent
-            if ffLock.locked():
-                await editMessage(stat_msg, f"‣ <b>Anime Name :</b> <b><i>{name}</i></b>\n\n<i>Queued to Encode...</i>")
-                await rep.report("Added Task to Queue...", "info")
-            await ffQueue.put(post_id)
-            await ffEvent.wait()
-            
-            await ffLock.acquire()
-            btns = []
-            for qual in Var.QUALS:
-                filename = await aniInfo.get_upname(qual)
-                await editMessage(stat_msg, f"‣ <b>Anime Name :</b> <b><i>{name}</i></b>\n\n<i>Ready to Encode...</i>")
-                
-                await asleep(1.5)
-                await rep.report("Starting Encode...", "info")
-                try:
-                    out_path = await FFEncoder(stat_msg, dl, filename, qual).start_encode()
-                except Exception as e:
-                    await rep.report(f"Error: {e}, Cancelled,  Retry Again !", "error")
-                    await stat_msg.delete()
-                    ffLock.release()
+                if "[Batch]" in name:
+                    await rep.report(f"Torrent Skipped!\n\n{name}", "warning")
+                    handled = True
                     return
-                await rep.report("Succesfully Compressed Now Going To Upload...", "info")
-                
-                await editMessage(stat_msg, f"‣ <b>Anime Name :</b> <b><i>{filename}</i></b>\n\n<i>Ready to Upload...</i>")
+
+                await rep.report(f"New Anime Torrent Found!\n\n{name}", "info")
+                post_msg = await msgsch.run(Var.MAIN_CHANNEL, partial(bot.send_photo,
+                    Var.MAIN_CHANNEL,
+                    photo=await aniInfo.get_poster(),
+                    caption=await aniInfo.get_caption()
+                ))
+                #post_msg = await sendMessage(Var.MAIN_CHANNEL, (await aniInfo.get_caption()).format(await aniInfo.get_poster()), invert_media=True)
+
                 await asleep(1.5)
-                try:
-                    msg = await TgUploader(stat_msg).upload(out_path, qual)
-                except Exception as e:
-                    await rep.report(f"Error: {e}, Cancelled,  Retry Again !", "error")
-                    await stat_msg.delete()
-                    ffLock.release()
-                    return
-                await rep.report("Succesfully Uploaded File into Tg...", "info")
-                
-                msg_id = msg.id
-                link = f"https://telegram.me/{(await bot.get_me()).username}?start={await encode('get-'+str(msg_id * abs(Var.FILE_STORE)))}"
-                
-                if post_msg:
-                    if len(btns) != 0 and len(btns[-1]) == 1:
-                        btns[-1].insert(1, InlineKeyboardButton(f"{btn_formatter[qual]}", url=link))
-                    else:
-                        btns.append([InlineKeyboardButton(f"{btn_formatter[qual]}", url=link)])
-                    await editMessage(post_msg, post_msg.caption.html if post_msg.caption else "", InlineKeyboardMarkup(btns))
-                    
-                await db.saveAnime(ani_id, ep_no, qual, post_id)
-                bot_loop.create_task(extra_utils(msg_id, out_path))
-            ffLock.release()
-            
-            await stat_msg.delete()
-            await aioremove(dl)
-        ani_cache['completed'].add(ani_id)
+                stat_msg = await sendMessage(Var.MAIN_CHANNEL, f"‣ <b>Anime Name :</b> <b><i>{name}</i></b>\n\n<i>Queued to Download...</i>")
+                job = AnimeJob(name, torrent, aniInfo, post_msg, stat_msg)
+                job.claimed = claimed
+                await pipeline.submit(job)
+                submitted = True
+            handled = True
+        finally:
+            # Submitted jobs hold the claim until the pipeline finishes them
+            if claimed and not submitted:
+                epstore.release(ani_id, ep_no)
     except Exception as error:
         await rep.report(format_exc(), "error")
-
-async def extra_utils(msg_id, out_path):
-    msg = await bot.get_messages(Var.FILE_STORE, message_ids=msg_id)
-
-    if Var.BACKUP_CHANNEL != 0:
-        for chat_id in Var.BACKUP_CHANNEL.split():
-            await msg.copy(int(chat_id))
-            
-    # MediaInfo, ScreenShots, Sample Video ( Add-ons Features )
+    finally:
+        if guid is not None and handled:
+            await poller.done(guid)
+        elif guid is not None:
+            poller.retry(guid)
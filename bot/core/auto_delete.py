@@ -0,0 +1,69 @@
+from time import time
+from heapq import heappush, heappop
+from functools import partial
+from traceback import format_exc
+from asyncio import sleep as asleep
+
+from bot import bot, bot_loop, LOGS
+from .database import db
+from .msg_scheduler import msgsch
+
+TICK = 5
+BATCH_SIZE = 100
+
+class AutoDeleter:
+    """Mongo-backed (chat_id, msg_id, due_at) deletions driven by one timer loop over a heap."""
+    def __init__(self, tick=TICK):
+        self.__tick = tick
+        self.__heap = []
+        self.__new = []
+        self.__task = None
+
+    async def start(self):
+        if self.__task is not None:
+            return
+        for item in await db.getDeletions():
+            heappush(self.__heap, item)
+        LOGS.info(f"Auto Delete Loaded : {len(self.__heap)} Pending Message(s)")
+        self.__task = bot_loop.create_task(self.__run())
+
+    def schedule(self, chat_id, msg_id, delay):
+        item = (time() + delay, chat_id, msg_id)
+        heappush(self.__heap, item)
+        self.__new.append(item)
+
+    async def __run(self):
+        while True:
+            await asleep(self.__tick)
+            try:
+                await self.__persist()
+                await self.__expire()
+            except Exception:
+                LOGS.error(format_exc())
+
+    async def __persist(self):
+        items, self.__new = self.__new, []
+        try:
+            await db.addDeletions(items)
+        except Exception:
+            self.__new.extend(items)
+            raise
+
+    async def __expire(self):
+        now, due = time(), {}
+        while self.__heap and self.__heap[0][0] <= now:
+            _, chat_id, msg_id = heappop(self.__heap)
+            due.setdefault(chat_id, []).append(msg_id)
+        for chat_id, msg_ids in due.items():
+            for i in range(0, len(msg_ids), BATCH_SIZE):
+                batch = msg_ids[i:i+BATCH_SIZE]
+                try:
+                    await msgsch.run(chat_id, partial(bot.delete_messages, chat_id, batch))
+                except Exception as e:
+                    LOGS.warning(f"Auto Delete Failed in {chat_id} : {e}")
+                await db.removeDeletions([(chat_id, msg_id) for msg_id in batch])
+
+    async def flush(self):
+        await self.__persist()
+
+autodel = AutoDeleter()
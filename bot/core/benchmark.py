@@ -0,0 +1,125 @@
+from re import search, sub, escape
+from time import time
+from os import path as ospath, makedirs
+from socket import gethostname
+from collections import deque
+from asyncio import gather, create_subprocess_shell
+from asyncio.subprocess import PIPE
+from aioshutil import rmtree as aiormtree
+
+from bot import Var, LOGS
+from .ffencoder import ffargs, FFProgress, read_progress, read_tail
+from .ffpool import ffpool
+from .database import db
+from .func_utils import convertBytes
+
+BENCH_DIR = ospath.join("encode", "benchmark")
+EPISODE_SECS = 1440
+
+def set_ffopt(ffcode, opt, value):
+    """Sets (or adds as an output option) `opt value` in an ffargs template."""
+    if search(rf"(?<!\S){escape(opt)}\s+\S+", ffcode):
+        return sub(rf"(?<!\S)({escape(opt)}\s+)\S+", lambda m: f"{m.group(1)}{value}", ffcode, count=1)
+    if (idx := ffcode.rfind("'{}'")) == -1:
+        return ffcode
+    return f"{ffcode[:idx]}{opt} {value} {ffcode[idx:]}"
+
+def get_ffopt(ffcode, opt):
+    return m.group(1) if (m := search(rf"(?<!\S){escape(opt)}\s+(\S+)", ffcode)) else None
+
+def parse_targets(targets):
+    return {qual: float(size) * 1024 * 1024 for qual, size in (item.split(':', 1) for item in targets.split() if ':' in item)}
+
+class ProfileBenchmark:
+    def __init__(self, quals, sample=None, duration=None):
+        self.__quals = [qual for qual in quals if qual in ffargs and get_ffopt(ffargs[qual], '-c:v') != 'copy']
+        self.__sample = sample
+        self.__duration = duration or Var.BENCH_SECS
+        self.__targets = parse_targets(Var.BENCH_TARGETS)
+        self.results = {}
+
+    def candidates(self, qual):
+        base = ffargs[qual]
+        crf = get_ffopt(base, '-crf')
+        crfs = Var.BENCH_CRFS.split() or ([crf] if crf else [None])
+        # Same -threads budget the pool gives this quality in production, it stays out of the saved ffcode
+        threads = max(1, round(ffpool.threads * ffpool.cost(qual)))
+        for preset in Var.BENCH_PRESETS.split():
+            for crf in crfs:
+                ffcode = set_ffopt(base, '-preset', preset)
+                if crf:
+                    ffcode = set_ffopt(ffcode, '-crf', crf)
+                yield {'preset': preset, 'crf': crf, 'threads': threads, 'ffcode': ffcode}
+
+    def __input(self, ffcode):
+        if self.__sample:
+            return ffcode.replace("-i '{}'", f"-ss 120 -t {self.__duration} -i '{{}}'", 1), self.__sample
+        return ffcode.replace("-i '{}'", "-f lavfi -i '{}'", 1), f"testsrc2=size=1920x1080:rate=24000/1001:duration={self.__duration}"
+
+    async def __run(self, qual, cand, out_path):
+        ffcode, src = self.__input(set_ffopt(cand['ffcode'], '-threads', cand['threads']))
+        state, tail = FFProgress(), deque(maxlen=20)
+        start = time()
+        proc = await create_subprocess_shell(ffcode.format(src, "pipe:1", out_path), stdout=PIPE, stderr=PIPE)
+        await gather(read_progress(proc.stdout, state), read_tail(proc.stderr, tail))
+        if await proc.wait() != 0 or not ospath.exists(out_path):
+            LOGS.error(f"Benchmark {qual} {cand['preset']} Failed: {' '.join(tail)}")
+            return None
+        wall = time() - start
+        size = ospath.getsize(out_path)
+        secs = state.out_time or self.__duration
+        return {**cand, 'fps': round(state.frame / wall, 2), 'wall': round(wall, 2),
+                'size': size, 'ep_size': size / secs * EPISODE_SECS}
+
+    async def run(self):
+        makedirs(BENCH_DIR, exist_ok=True)
+        try:
+            for qual in self.__quals:
+                runs = []
+                for n, cand in enumerate(self.candidates(qual)):
+                    # The whole pool is reserved so no production encode skews the measured speed
+                    async with ffpool.slot("benchmark", qual, exclusive=True):
+                        if res := await self.__run(qual, cand, ospath.join(BENCH_DIR, f"{qual}_{n}.mkv")):
+                            runs.append(res)
+                self.results[qual] = runs
+        finally:
+            await aiormtree(BENCH_DIR)
+        return self.recommend()
+
+    def recommend(self):
+        best = {}
+        for qual, runs in self.results.items():
+            if not runs:
+                continue
+            target = self.__targets.get(qual)
+            fitting = [r for r in runs if not target or r['ep_size'] <= target]
+            best[qual] = max(fitting, key=lambda r: r['fps']) if fitting else min(runs, key=lambda r: r['ep_size'])
+        return best
+
+    def summary(self, best):
+        txt = f"<b>Encoder Benchmark : {gethostname()}</b>\n"
+        for qual, runs in self.results.items():
+            txt += f"\n<b>{qual} :</b> {len(runs)} Run(s)\n"
+            if res := best.get(qual):
+                txt += f"    ‣ <b>Best :</b> <code>-preset {res['preset']} -crf {res['crf']}</code> ( {res['threads']} Thread(s) )\n"
+                txt += f"    ‣ <b>Speed :</b> {res['fps']} fps, {res['wall']}s\n"
+                txt += f"    ‣ <b>Episode Size :</b> ~ {convertBytes(res['ep_size'])}\n"
+        return txt
+
+async def save_tuned(best):
+    host = gethostname()
+    for qual, res in best.items():
+        ffargs[qual] = res['ffcode']
+        await db.saveProfile(host, qual, res['ffcode'])
+
+async def load_tuned():
+    for qual, ffcode in (await db.getProfiles(gethostname())).items():
+        if qual in ffargs:
+            ffargs[qual] = ffcode
+            LOGS.info(f"Loaded Tuned FFCode for {qual}")
+
+async def drop_tuned(quals):
+    host = gethostname()
+    for qual in quals:
+        await db.removeProfile(host, qual)
+        LOGS.info(f"Dropped Tuned FFCode for {qual}, config.env Changed it")
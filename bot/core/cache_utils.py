@@ -0,0 +1,38 @@
+from collections import OrderedDict
+from time import time
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=None):
+        self.__data = OrderedDict()
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        if (item := self.__data.get(key)) is None:
+            return default
+        expires, value = item
+        if expires is not None and expires < time():
+            del self.__data[key]
+            return default
+        self.__data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        self.__data[key] = (time() + ttl if ttl is not None else None, value)
+        self.__data.move_to_end(key)
+        while len(self.__data) > self.maxsize:
+            self.__data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self.__data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self.__data.clear()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.__data)
@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 from bot import Var
 
 class MongoDB:
@@ -7,21 +8,84 @@ class MongoDB:
         self.__db = self.__client[database_name]
         self.__animes = self.__db.animes[Var.BOT_TOKEN.split(':')[0]]
         self.__channels = self.__db.channels  # New collection for anime-channel mappings
+        self.__feeds = self.__db.feeds[Var.BOT_TOKEN.split(':')[0]]
+        self.__seen = self.__db.seen[Var.BOT_TOKEN.split(':')[0]]
+        self.__anilist = self.__db.anilist
+        self.__profiles = self.__db.profiles[Var.BOT_TOKEN.split(':')[0]]
+        self.__deletes = self.__db.deletes[Var.BOT_TOKEN.split(':')[0]]
+        self.__jobs = self.__db.jobs[Var.BOT_TOKEN.split(':')[0]]
 
     async def getAnime(self, ani_id):
         botset = await self.__animes.find_one({'_id': ani_id})
         return botset or {}
 
-    async def saveAnime(self, ani_id, ep, qual, post_id=None):
-        quals = (await self.getAnime(ani_id)).get(ep, {qual: False for qual in Var.QUALS})
-        quals[qual] = True
-        await self.__animes.update_one({'_id': ani_id}, {'$set': {ep: quals}}, upsert=True)
-        if post_id:
-            await self.__animes.update_one({'_id': ani_id}, {'$set': {"msg_id": post_id}}, upsert=True)
+    async def getAnimes(self):
+        """All anime documents, oldest post first."""
+        return [item async for item in self.__animes.find().sort('msg_id', 1)]
+
+    async def saveEpisodes(self, updates):
+        """Applies {ani_id: {dotted field: value}} in a single bulk write."""
+        if updates:
+            await self.__animes.bulk_write([UpdateOne({'_id': ani_id}, {'$set': fields}, upsert=True) for ani_id, fields in updates.items()], ordered=False)
 
     async def reboot(self):
         await self.__animes.drop()
 
+    async def getFeedStates(self):
+        return {item['_id']: item async for item in self.__feeds.find()}
+
+    async def saveFeedState(self, link, etag=None, modified=None):
+        await self.__feeds.update_one({'_id': link}, {'$set': {'etag': etag, 'modified': modified}}, upsert=True)
+
+    async def getSeenGuids(self, since=0):
+        return {item['_id']: item['seen_at'] async for item in self.__seen.find({'seen_at': {'$gte': since}})}
+
+    async def addSeenGuids(self, guids, seen_at):
+        if guids:
+            await self.__seen.bulk_write([UpdateOne({'_id': guid}, {'$set': {'seen_at': seen_at}}, upsert=True) for guid in guids], ordered=False)
+
+    async def pruneSeenGuids(self, before):
+        await self.__seen.delete_many({'seen_at': {'$lt': before}})
+
+    async def getAniData(self, name=None, ani_id=None):
+        return await self.__anilist.find_one({'_id': ani_id} if ani_id is not None else {'queries': name})
+
+    async def saveAniData(self, entry, query=None):
+        """Stores an entry, the query name now resolving to it is taken off any other entry."""
+        await self.__anilist.replace_one({'_id': entry['_id']}, entry, upsert=True)
+        if query:
+            await self.__anilist.update_many({'_id': {'$ne': entry['_id']}, 'queries': query}, {'$pull': {'queries': query}})
+
+    async def getProfiles(self, host):
+        return {item['qual']: item['ffcode'] async for item in self.__profiles.find({'host': host})}
+
+    async def saveProfile(self, host, qual, ffcode):
+        await self.__profiles.update_one({'_id': f"{host}:{qual}"}, {'$set': {'host': host, 'qual': qual, 'ffcode': ffcode}}, upsert=True)
+
+    async def removeProfile(self, host, qual):
+        await self.__profiles.delete_one({'_id': f"{host}:{qual}"})
+
+    async def getDeletions(self):
+        return [(item['due_at'], item['chat_id'], item['msg_id']) async for item in self.__deletes.find()]
+
+    async def addDeletions(self, items):
+        """Stores (due_at, chat_id, msg_id) entries in a single bulk write."""
+        if items:
+            await self.__deletes.bulk_write([UpdateOne({'_id': f"{chat_id}:{msg_id}"}, {'$set': {'chat_id': chat_id, 'msg_id': msg_id, 'due_at': due_at}}, upsert=True) for due_at, chat_id, msg_id in items], ordered=False)
+
+    async def removeDeletions(self, items):
+        if items:
+            await self.__deletes.delete_many({'_id': {'$in': [f"{chat_id}:{msg_id}" for chat_id, msg_id in items]}})
+
+    async def getJobs(self):
+        return [item async for item in self.__jobs.find().sort('_id', 1)]
+
+    async def saveJob(self, job_id, fields):
+        await self.__jobs.update_one({'_id': job_id}, {'$set': fields}, upsert=True)
+
+    async def removeJob(self, job_id):
+        await self.__jobs.delete_one({'_id': job_id})
+
     # New Functions for Separate Channel Mapping
     async def set_separate_channel(self, anime_name, channel_id):
         """Set a separate upload channel for a specific anime."""
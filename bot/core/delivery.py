@@ -0,0 +1,41 @@
+from functools import partial
+from pyrogram.errors import FileReferenceExpired, FileReferenceInvalid, MediaEmpty
+
+from bot import Var, LOGS
+from .cache_utils import LRUCache
+from .msg_scheduler import msgsch
+
+class DeliveryCache:
+    """FILE_STORE message id -> (file_id, caption), so a deep link click is a single send_cached_media call."""
+    def __init__(self, maxsize):
+        self.__items = LRUCache(maxsize)
+
+    def add(self, msg):
+        if not msg or msg.empty or not msg.media or not (media := getattr(msg, msg.media.value, None)):
+            return
+        self.__items.set(msg.id, (media.file_id, msg.caption.html if msg.caption else None))
+
+    def discard(self, msg_id):
+        self.__items.pop(msg_id)
+
+    async def deliver(self, client, chat_id, msg_id, retry=True):
+        """Sends the stored file to chat_id, None if the message does not exist."""
+        if (item := self.__items.get(msg_id)) is None:
+            msg = await client.get_messages(Var.FILE_STORE, message_ids=msg_id)
+            if msg.empty:
+                return None
+            self.add(msg)
+            if (item := self.__items.get(msg_id)) is None:
+                LOGS.warning(f"No Cacheable Media in {msg_id}, Copying Instead")
+                return await msgsch.run(chat_id, partial(msg.copy, chat_id, reply_markup=None))
+        file_id, caption = item
+        try:
+            return await msgsch.run(chat_id, partial(client.send_cached_media, chat_id, file_id, caption=caption))
+        except (FileReferenceExpired, FileReferenceInvalid, MediaEmpty):
+            if not retry:
+                raise
+            # Stale file_id, the message is fetched again for a fresh one
+            self.discard(msg_id)
+            return await self.deliver(client, chat_id, msg_id, retry=False)
+
+delivery = DeliveryCache(Var.DELIVERY_CACHE)
@@ -0,0 +1,36 @@
+from asyncio import gather, sleep as asleep
+
+from bot import bot, Var
+from .msg_scheduler import msgsch
+from .ratelimit import backoff
+from .reporter import rep
+
+class Distributor:
+    """Copies an uploaded FILE_STORE message to every target chat concurrently, each with its own retries."""
+    def __init__(self, retries=3):
+        self.__retries = retries
+
+    async def __copy(self, chat_id, msg_id):
+        error = None
+        for attempt in range(self.__retries):
+            try:
+                await msgsch.run(chat_id, lambda: bot.copy_message(chat_id, Var.FILE_STORE, msg_id))
+                return None
+            except Exception as e:
+                error = e
+                await asleep(backoff(attempt))
+        return error
+
+    async def distribute(self, msg_id, targets, name=""):
+        """Returns {chat_id: error or None} and reports the outcome per target."""
+        if not (targets := list(dict.fromkeys(int(chat_id) for chat_id in targets))):
+            return {}
+        results = dict(zip(targets, await gather(*(self.__copy(chat_id, msg_id) for chat_id in targets))))
+        failed = {chat_id: err for chat_id, err in results.items() if err is not None}
+        txt = f"Distributed {name or msg_id} to {len(targets) - len(failed)}/{len(targets)} Channel(s)"
+        for chat_id, err in failed.items():
+            txt += f"\n    • {chat_id} : {err}"
+        await rep.report(txt, "warning" if failed else "info")
+        return results
+
+distributor = Distributor()
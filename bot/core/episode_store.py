@@ -0,0 +1,76 @@
+from asyncio import sleep as asleep
+from traceback import format_exc
+
+from bot import Var, LOGS, bot_loop
+from .database import db
+from .cache_utils import LRUCache
+
+FLUSH_DELAY = 3
+
+class EpisodeStore:
+    """Write-through map of ani_id -> {episode: {quality: True}, 'msg_id': post_id} in front of the animes collection."""
+    def __init__(self, maxsize, delay=FLUSH_DELAY):
+        # Shows that stop airing fall out of the LRU and are read through again if they ever return
+        self.__animes = LRUCache(maxsize)
+        self.__pending = {}
+        self.__active = set()
+        self.__delay = delay
+        self.__flusher = None
+
+    async def warm(self):
+        """Bulk loads the index, most recently posted shows last so they survive the LRU cap."""
+        for doc in await db.getAnimes():
+            self.__animes.set(doc['_id'], doc)
+        LOGS.info(f"Episode Index Warmed : {len(self.__animes)} Anime(s)")
+
+    async def get(self, ani_id):
+        if (anime := self.__animes.get(ani_id)) is None:
+            anime = await db.getAnime(ani_id)
+            self.__animes.set(ani_id, anime)
+        return anime
+
+    def claim(self, ani_id, ep):
+        """Marks an episode as in progress, False if it already is."""
+        if (key := (ani_id, str(ep))) in self.__active:
+            return False
+        self.__active.add(key)
+        return True
+
+    def release(self, ani_id, ep):
+        self.__active.discard((ani_id, str(ep)))
+
+    async def is_done(self, ani_id, ep, quals=None):
+        """True once every quality of the episode has been uploaded."""
+        eps = (await self.get(ani_id)).get(str(ep)) or {}
+        return all(eps.get(qual) for qual in (quals or Var.QUALS))
+
+    async def save(self, ani_id, ep, qual, post_id=None):
+        anime = await self.get(ani_id)
+        anime.setdefault(str(ep), {})[qual] = True
+        fields = self.__pending.setdefault(ani_id, {})
+        fields[f"{ep}.{qual}"] = True
+        if post_id:
+            anime['msg_id'] = fields['msg_id'] = post_id
+        if self.__flusher is None:
+            # Qualities of one episode finish close together, so let them share a bulk write
+            self.__flusher = bot_loop.create_task(self.__flush_later())
+
+    async def __flush_later(self):
+        await asleep(self.__delay)
+        self.__flusher = None
+        await self.flush()
+
+    async def flush(self):
+        pending, self.__pending = self.__pending, {}
+        if not pending:
+            return
+        try:
+            await db.saveEpisodes(pending)
+        except Exception:
+            LOGS.error(format_exc())
+            for ani_id, fields in pending.items():
+                self.__pending[ani_id] = {**fields, **self.__pending.get(ani_id, {})}
+            if self.__flusher is None:
+                self.__flusher = bot_loop.create_task(self.__flush_later())
+
+epstore = EpisodeStore(Var.EP_CACHE_SIZE)
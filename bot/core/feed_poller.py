@@ -0,0 +1,112 @@
+from time import time
+from asyncio import gather
+from traceback import format_exc
+from aiohttp import ClientSession, ClientTimeout
+from feedparser import parse as feedparse
+
+from bot import Var, LOGS
+from .database import db
+from .func_utils import sync_to_async
+
+SEEN_RETENTION = 14 * 24 * 3600
+
+class FeedPoller:
+    def __init__(self, links):
+        self.__links = links
+        self.__states = {}
+        self.__seen = {}
+        self.__pending = {}
+        self.__failed = {}
+        self.__loaded = False
+        self.__warm = False
+
+    async def load(self):
+        since = time() - SEEN_RETENTION
+        self.__states = await db.getFeedStates()
+        self.__seen = await db.getSeenGuids(since)
+        await db.pruneSeenGuids(since)
+        self.__loaded = True
+        # The saved validators predate entries left unhandled by a restart, the first poll fetches every feed in full
+        self.__warm = False
+        LOGS.info(f"Feed Poller Loaded : {len(self.__states)} Feed(s), {len(self.__seen)} Seen Entries")
+
+    @staticmethod
+    def get_guid(entry):
+        return entry.get('id') or entry.get('link')
+
+    async def __fetch(self, sess, link):
+        known, state = link in self.__states, self.__states.get(link, {})
+        headers = {}
+        if self.__warm and state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if self.__warm and state.get('modified'):
+            headers['If-Modified-Since'] = state['modified']
+        try:
+            async with sess.get(link, headers=headers) as resp:
+                if resp.status == 304:
+                    return link, [], known
+                if resp.status != 200:
+                    LOGS.warning(f"RSS Feed Error: {resp.status} for {link}")
+                    return link, [], known
+                content = await resp.read()
+                etag, modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+        except Exception:
+            LOGS.error(format_exc())
+            return link, [], known
+        feed = await sync_to_async(feedparse, content)
+        if not known or etag != state.get('etag') or modified != state.get('modified'):
+            self.__states[link] = {'etag': etag, 'modified': modified}
+            await db.saveFeedState(link, etag, modified)
+        return link, feed.entries, known
+
+    async def poll(self):
+        if not self.__loaded:
+            await self.load()
+        async with ClientSession(timeout=ClientTimeout(total=30)) as sess:
+            results = await gather(*(self.__fetch(sess, link) for link in list(self.__links)))
+        self.__warm = True
+
+        # Entries whose handling failed go out again first, a 304 would never bring them back
+        new_entries, skipped = list(self.__failed.values()), []
+        self.__pending.update(self.__failed)
+        self.__failed.clear()
+        for link, entries, known in results:
+            fresh = []
+            for entry in entries:
+                if (guid := self.get_guid(entry)) and guid not in self.__seen and guid not in self.__pending and guid not in skipped:
+                    fresh.append(entry)
+                    self.__pending[guid] = entry
+            if not known:
+                # First poll of a feed only takes its newest entry, the backlog is just indexed
+                skipped.extend(self.get_guid(entry) for entry in fresh[1:])
+                for guid in skipped:
+                    self.__pending.pop(guid, None)
+                fresh = fresh[:1]
+            new_entries.extend(reversed(fresh))
+
+        await self.__mark(skipped)
+        self.__prune()
+        return new_entries
+
+    async def __mark(self, guids):
+        if guids:
+            now = time()
+            self.__seen.update({guid: now for guid in guids})
+            await db.addSeenGuids(guids, now)
+
+    async def done(self, guid):
+        """Marks an entry seen once it was submitted or deliberately skipped, so a restart before that retries it."""
+        self.__pending.pop(guid, None)
+        await self.__mark([guid])
+
+    def retry(self, guid):
+        """Hands an entry whose handling failed back to the next poll."""
+        if (entry := self.__pending.pop(guid, None)) is not None:
+            self.__failed[guid] = entry
+
+    def __prune(self):
+        since = time() - SEEN_RETENTION
+        for guid in [guid for guid, seen_at in self.__seen.items() if seen_at < since]:
+            del self.__seen[guid]
+
+poller = FeedPoller(Var.RSS_ITEMS)
@@ -1,51 +1,174 @@
-from re import findall 
 from math import floor
 from time import time
 from os import path as ospath
-from aiofiles import open as aiopen
-from aiofiles.os import remove as aioremove, rename as aiorename
+from collections import deque
+from aiofiles.os import rename as aiorename
 from shlex import split as ssplit
-from asyncio import sleep as asleep, gather, create_subprocess_shell, create_task
+from asyncio import sleep as asleep, gather, create_subprocess_shell, create_subprocess_exec, create_task
 from asyncio.subprocess import PIPE
 
 from bot import Var, bot_loop, ffpids_cache, LOGS
 from .func_utils import mediainfo, convertBytes, convertTime, sendMessage, editMessage
 from .reporter import rep
+from .streaming import feed_stream
 
-ffargs = {
-    '1080': Var.FFCODE_1080,
-    '720': Var.FFCODE_720,
-    '480': Var.FFCODE_480,
-    'Hdrip': Var.FFCODE_Hdrip,
-}
+ffargs = {}
+
+def load_ffargs():
+    """(Re)builds ffargs in place from Var, so every module holding it sees the new templates."""
+    ffargs.clear()
+    ffargs.update({
+        '1080': Var.FFCODE_1080,
+        '720': Var.FFCODE_720,
+        '480': Var.FFCODE_480,
+        'Hdrip': Var.FFCODE_Hdrip,
+    })
+
+load_ffargs()
+
+def parse_ffcode(ffcode):
+    """Splits an ffargs template into (input opts, output opts, trailing opts), None if it is not a plain one-output template."""
+    try:
+        args = ssplit(ffcode)
+    except ValueError:
+        return None
+    if not args or args[0] != 'ffmpeg' or args.count('{}') != 3 or '-progress' not in args or '-i' not in args:
+        return None
+    prog_idx = args.index('-progress')
+    del args[prog_idx:prog_idx+2]
+    in_idx = args.index('-i')
+    if args[in_idx+1] != '{}' or '{}' not in args[in_idx+2:]:
+        return None
+    after = args[in_idx+2:]
+    out_idx = after.index('{}')
+    return args[1:in_idx], after[:out_idx], after[out_idx+1:]
+
+def build_multi_ffcode(in_path, prog_file, outputs, threads=None):
+    """Builds one ffmpeg invocation that decodes once and writes every quality in outputs ({qual: out_path})."""
+    in_opts, post_opts, graph, labels, cmd_outs = None, [], [], [], []
+    for qual, out_path in outputs.items():
+        if not (parsed := parse_ffcode(ffargs[qual])):
+            return None
+        pre, opts, post = parsed
+        in_opts = pre if in_opts is None else in_opts
+        post_opts.extend(o for o in post if o not in post_opts)
+        size, vf, vcodec, maps, oargs = None, None, None, [], []
+        it = iter(opts)
+        for opt in it:
+            if opt == '-s':
+                size = next(it, None)
+            elif opt in ('-vf', '-filter:v'):
+                vf = next(it, None)
+            elif opt == '-map':
+                maps.append(next(it, '0'))
+            else:
+                if opt in ('-c:v', '-vcodec', '-codec:v'):
+                    vcodec = next(it, None)
+                    oargs.extend((opt, vcodec))
+                    continue
+                oargs.append(opt)
+        if vcodec == 'copy':
+            vmap = '0:v'
+            if size or vf:
+                return None
+        else:
+            chain = ",".join(f for f in (f"scale={size.replace('x', ':')}" if size else None, vf) if f) or "null"
+            vmap = f"[v{len(labels)}]"
+            labels.append(vmap)
+            graph.append(f"{chain}{vmap}")
+        omaps = [vmap]
+        for m in maps or ['0:a:0?', '0:s:0?']:
+            if m == '0':
+                omaps.extend(('0:a?', '0:s?', '0:t?'))
+            elif not m.startswith('0:v'):
+                omaps.append(m)
+        if threads and '-threads' not in oargs:
+            oargs.extend(('-threads', str(max(1, round(threads / len(outputs))))))
+        cmd_outs.extend([arg for m in omaps for arg in ('-map', m)] + oargs + [out_path])
+    cmd = ['ffmpeg', *in_opts, '-i', in_path, '-progress', prog_file]
+    if labels:
+        splits = "".join(f"[s{n}]" for n in range(len(labels)))
+        fgraph = [f"[0:v:0]split={len(labels)}{splits}"] + [f"[s{n}]{g}" for n, g in enumerate(graph)] if len(labels) > 1 else [f"[0:v:0]{graph[0]}"]
+        cmd.extend(('-filter_complex', ";".join(fgraph)))
+    return cmd + cmd_outs + post_opts
+
+def with_threads(ffcode, threads):
+    """Adds a -threads budget as an output option of an ffargs template."""
+    if not threads or '-threads' in ffcode or (idx := ffcode.rfind("'{}'")) == -1:
+        return ffcode
+    return f"{ffcode[:idx]}-threads {threads} {ffcode[idx:]}"
+
+class FFProgress:
+    """Latest values of an ffmpeg -progress stream, updated once per progress block."""
+    def __init__(self):
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = 0.0
+        self.out_time = 0.0
+        self.total_size = 0
+        self.finished = False
+        self.updated = 0.0
+        self.__block = {}
+
+    @staticmethod
+    def __num(value, default):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+
+    def feed(self, line):
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            return
+        self.__block[key] = value
+        if key != 'progress':
+            return
+        block, self.__block = self.__block, {}
+        self.frame = int(self.__num(block.get('frame'), self.frame))
+        self.fps = self.__num(block.get('fps'), self.fps)
+        self.speed = self.__num(block.get('speed', '').rstrip('x'), self.speed)
+        self.out_time = self.__num(block.get('out_time_us') or block.get('out_time_ms'), self.out_time * 1000000) / 1000000
+        self.total_size = int(self.__num(block.get('total_size'), self.total_size))
+        self.finished = value == 'end'
+        self.updated = time()
+
+async def read_progress(stream, state):
+    async for line in stream:
+        state.feed(line.decode(errors='ignore'))
+
+async def read_tail(stream, tail):
+    async for line in stream:
+        tail.append(line.decode(errors='ignore').rstrip())
 
 class FFEncoder:
-    def __init__(self, message, path, name, qual):
+    def __init__(self, message, workspace, name, qual, threads=None, stream=None):
         self.__proc = None
         self.is_cancelled = False
         self.message = message
         self.__name = name
         self.__qual = qual
-        self.dl_path = path
+        self.__workspace = workspace
+        self.dl_path = workspace.source
         self.__total_time = None
-        self.out_path = ospath.join("encode", name)
-        self.__prog_file = 'prog.txt'
+        self.__threads = threads
+        self.__stream = stream
+        self.out_path = workspace.out_path(qual, name)
+        self.state = FFProgress()
+        self.__stderr = deque(maxlen=50)
         self.__start_time = time()
 
     async def progress(self):
-        self.__total_time = await mediainfo(self.dl_path, get_duration=True)
+        self.__total_time = await mediainfo(self.__workspace.link_input(), get_duration=True)
         if isinstance(self.__total_time, str):
             self.__total_time = 1.0
-        while not (self.__proc is None or self.is_cancelled):
-            async with aiopen(self.__prog_file, 'r+') as p:
-                text = await p.read()
-            if text:
-                time_done = floor(int(t[-1]) / 1000000) if (t := findall("out_time_ms=(\d+)", text)) else 1
-                ensize = int(s[-1]) if (s := findall(r"total_size=(\d+)", text)) else 0
+        while not (self.__proc is None or self.is_cancelled or self.__proc.returncode is not None):
+            if self.state.updated:
+                ensize = self.state.total_size
 
                 diff = time() - self.__start_time
                 speed = ensize / diff
-                percent = round((time_done/self.__total_time)*100, 2)
+                percent = round((self.state.out_time/self.__total_time)*100, 2)
                 tsize = ensize / (max(percent, 0.01)/100)
                 eta = (tsize-ensize)/max(speed, 0.01)
 
@@ -55,39 +178,35 @@ class FFEncoder:
 <blockquote>‣ <b>Status :</b> <i>Encoding</i>
     <code>[{bar}]</code> {percent}%</blockquote> 
 <blockquote>   ‣ <b>Size :</b> {convertBytes(ensize)} out of ~ {convertBytes(tsize)}
-    ‣ <b>Speed :</b> {convertBytes(speed)}/s
+    ‣ <b>Speed :</b> {convertBytes(speed)}/s ( {self.state.fps} fps, {self.state.speed}x )
     ‣ <b>Time Took :</b> {convertTime(diff)}
     ‣ <b>Time Left :</b> {convertTime(eta)}</blockquote>
 <blockquote>‣ <b>File(s) Encoded:</b> <code>{Var.QUALS.index(self.__qual)} / {len(Var.QUALS)}</code></blockquote>"""
 
                 await editMessage(self.message, progress_str)
-                if (prog := findall(r"progress=(\w+)", text)) and prog[-1] == 'end':
+                if self.state.finished:
                     break
             await asleep(8)
 
     async def start_encode(self):
-        if ospath.exists(self.__prog_file):
-            await aioremove(self.__prog_file)
-
-        async with aiopen(self.__prog_file, 'w+'):
-            LOGS.info("Progress Temp Generated !")
-            pass
-
-        dl_npath, out_npath = ospath.join("encode", "ffanimeadvin.mkv"), ospath.join("encode", "ffanimeadvout.mkv")
-        await aiorename(self.dl_path, dl_npath)
-
-        ffcode = ffargs[self.__qual].format(dl_npath, self.__prog_file, out_npath)
+        dl_npath = "pipe:0" if self.__stream else self.__workspace.link_input()
+        out_npath = self.__workspace.tmp_out(self.__qual)
+        ffcode = with_threads(ffargs[self.__qual], self.__threads).format(dl_npath, "pipe:1", out_npath)
 
         LOGS.info(f'FFCode: {ffcode}')
-        self.__proc = await create_subprocess_shell(ffcode, stdout=PIPE, stderr=PIPE)
+        self.__proc = await create_subprocess_shell(ffcode, stdin=PIPE if self.__stream else None, stdout=PIPE, stderr=PIPE)
         proc_pid = self.__proc.pid
         ffpids_cache.append(proc_pid)
-        _, return_code = await gather(create_task(self.progress()), self.__proc.wait())
+        ui_task = create_task(self.progress())
+        readers = [read_progress(self.__proc.stdout, self.state), read_tail(self.__proc.stderr, self.__stderr)]
+        if self.__stream:
+            readers.append(feed_stream(self.__stream, self.__proc))
+        results = await gather(*readers)
+        return_code = await self.__proc.wait()
+        ui_task.cancel()
         ffpids_cache.remove(proc_pid)
 
-        await aiorename(dl_npath, self.dl_path)
-
-        if self.is_cancelled:
+        if self.is_cancelled or False in results:
             return
 
         if return_code == 0:
@@ -95,7 +214,96 @@ class FFEncoder:
                 await aiorename(out_npath, self.out_path)
             return self.out_path
         else:
-            await rep.report((await self.__proc.stderr.read()).decode().strip(), "error")
+            await rep.report("\n".join(self.__stderr), "error")
+
+    async def cancel_encode(self):
+        self.is_cancelled = True
+        if self.__proc is not None:
+            try:
+                self.__proc.kill()
+            except:
+                pass
+
+class FFMultiEncoder:
+    def __init__(self, message, workspace, names, threads=None, stream=None):
+        self.__proc = None
+        self.is_cancelled = False
+        self.message = message
+        self.__names = names
+        self.__threads = threads
+        self.__stream = stream
+        self.__workspace = workspace
+        self.dl_path = workspace.source
+        self.__total_time = None
+        self.out_paths = {qual: workspace.out_path(qual, name) for qual, name in names.items()}
+        self.__tmp_paths = {qual: workspace.tmp_out(qual) for qual in names}
+        self.state = FFProgress()
+        self.__stderr = deque(maxlen=50)
+        self.__start_time = time()
+
+    async def progress(self):
+        self.__total_time = await mediainfo(self.__workspace.link_input(), get_duration=True)
+        if isinstance(self.__total_time, str):
+            self.__total_time = 1.0
+        name = next(iter(self.__names.values()), "")
+        while not (self.__proc is None or self.is_cancelled or self.__proc.returncode is not None):
+            if self.state.updated:
+                ensize = self.state.total_size
+
+                diff = time() - self.__start_time
+                speed = ensize / diff
+                percent = round((self.state.out_time/self.__total_time)*100, 2)
+                eta = (diff / max(percent, 0.01)) * (100 - percent)
+
+                bar = floor(percent/8)*"█" + (12 - floor(percent/8))*"▒"
+                sizes = "\n".join(f"    ‣ <b>{qual}{'p' if qual.isdigit() else ''} :</b> {convertBytes(ospath.getsize(path)) if ospath.exists(path) else '-'}" for qual, path in self.__tmp_paths.items())
+
+                progress_str = f"""<blockquote>‣ <b>Anime Name :</b> <b><i>{name}</i></b></blockquote>
+<blockquote>‣ <b>Status :</b> <i>Encoding All Qualities</i>
+    <code>[{bar}]</code> {percent}%</blockquote> 
+<blockquote>   ‣ <b>Size :</b> {convertBytes(ensize)}
+    ‣ <b>Speed :</b> {convertBytes(speed)}/s ( {self.state.fps} fps, {self.state.speed}x )
+    ‣ <b>Time Took :</b> {convertTime(diff)}
+    ‣ <b>Time Left :</b> {convertTime(eta)}</blockquote>
+<blockquote>‣ <b>Output(s) :</b>
+{sizes}</blockquote>"""
+
+                await editMessage(self.message, progress_str)
+                if self.state.finished:
+                    break
+            await asleep(8)
+
+    async def start_encode(self):
+        dl_npath = "pipe:0" if self.__stream else self.__workspace.link_input()
+        if not (ffcode := build_multi_ffcode(dl_npath, "pipe:1", self.__tmp_paths, self.__threads)):
+            LOGS.warning("FFCodes can not be Merged into a Single Pass, Falling back to Encode per Quality")
+            return
+
+        LOGS.info(f'FFCode: {" ".join(ffcode)}')
+        self.__proc = await create_subprocess_exec(*ffcode, stdin=PIPE if self.__stream else None, stdout=PIPE, stderr=PIPE)
+        proc_pid = self.__proc.pid
+        ffpids_cache.append(proc_pid)
+        ui_task = create_task(self.progress())
+        readers = [read_progress(self.__proc.stdout, self.state), read_tail(self.__proc.stderr, self.__stderr)]
+        if self.__stream:
+            readers.append(feed_stream(self.__stream, self.__proc))
+        results = await gather(*readers)
+        return_code = await self.__proc.wait()
+        ui_task.cancel()
+        ffpids_cache.remove(proc_pid)
+
+        if self.is_cancelled or False in results:
+            return
+
+        if return_code == 0:
+            out_paths = {}
+            for qual, tmp_path in self.__tmp_paths.items():
+                if ospath.exists(tmp_path):
+                    await aiorename(tmp_path, self.out_paths[qual])
+                    out_paths[qual] = self.out_paths[qual]
+            return out_paths
+        else:
+            await rep.report("\n".join(self.__stderr), "error")
 
     async def cancel_encode(self):
         self.is_cancelled = True
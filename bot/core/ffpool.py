@@ -0,0 +1,83 @@
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from multiprocessing import cpu_count
+from math import ceil
+
+from bot import Var, bot_loop, LOGS
+
+class EncodePool:
+    def __init__(self, slots, threads, costs):
+        self.slots = slots
+        self.threads = threads
+        self.costs = costs
+        self.__used = 0.0
+        self.__running = {}
+        self.__waiters = OrderedDict()
+
+    @property
+    def busy(self):
+        return bool(self.__running) or bool(self.__waiters)
+
+    @property
+    def capacity(self):
+        """Most encodes that can run at once, every one at the cheapest configured quality."""
+        return max(1, ceil(self.slots / max(min((self.cost(qual) for qual in Var.QUALS), default=1.0), 1e-3)))
+
+    def cost(self, *quals):
+        return min(float(self.slots), sum(self.costs.get(qual, 1.0) for qual in quals))
+
+    def __admit(self):
+        while self.__waiters:
+            # Fair admission: the episode with the fewest running encodes goes first, ties by arrival
+            key = min(self.__waiters, key=lambda k: self.__running.get(k, 0))
+            cost, fut = self.__waiters[key][0]
+            if fut.done():
+                self.__pop(key)
+                continue
+            if self.__running and self.__used + cost > self.slots + 1e-6:
+                break
+            self.__pop(key)
+            self.__used += cost
+            self.__running[key] = self.__running.get(key, 0) + 1
+            fut.set_result(max(1, round(self.threads * cost)))
+
+    def __pop(self, key):
+        self.__waiters[key].popleft()
+        if not self.__waiters[key]:
+            del self.__waiters[key]
+
+    @asynccontextmanager
+    async def slot(self, key, *quals, exclusive=False):
+        """Waits for encoder capacity for the given qualities (the whole pool if exclusive), yields the -threads budget for the job."""
+        cost = float(self.slots) if exclusive else self.cost(*quals)
+        fut = bot_loop.create_future()
+        self.__waiters.setdefault(key, deque()).append((cost, fut))
+        self.__admit()
+        try:
+            threads = await fut
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self.__release(key, cost)
+            else:
+                self.__admit()
+            raise
+        try:
+            yield threads
+        finally:
+            self.__release(key, cost)
+
+    def __release(self, key, cost):
+        self.__used = max(0.0, self.__used - cost)
+        if (running := self.__running.get(key, 0) - 1) > 0:
+            self.__running[key] = running
+        else:
+            self.__running.pop(key, None)
+        if not self.__running:
+            self.__used = 0.0
+        self.__admit()
+
+def parse_costs(costs):
+    return {qual: float(cost) for qual, cost in (item.split(':', 1) for item in costs.split() if ':' in item)}
+
+ffpool = EncodePool(Var.FF_SLOTS or max(1, cpu_count() // Var.FF_THREADS), Var.FF_THREADS, parse_costs(Var.FF_COSTS))
+LOGS.info(f"Encode Pool : {ffpool.slots} Slot(s) x {ffpool.threads} Thread(s)")
@@ -0,0 +1,56 @@
+from asyncio import gather
+from traceback import format_exc
+from pyrogram.enums import ChatMemberStatus
+from pyrogram.errors import UserNotParticipant
+
+from bot import bot, Var
+from .cache_utils import LRUCache
+from .reporter import rep
+
+class FSubChecker:
+    """Force-subscribe membership with per (user, chat) positive results cached for a TTL."""
+    def __init__(self, ttl, maxsize=16384):
+        self.__members = LRUCache(maxsize, ttl)
+        self.__chats = {}
+
+    async def __check(self, uid, chat_id):
+        """True if joined, False if not, None if Telegram could not tell."""
+        if (uid, chat_id) in self.__members:
+            return True
+        try:
+            member = await bot.get_chat_member(chat_id=chat_id, user_id=uid)
+        except UserNotParticipant:
+            return False
+        except Exception:
+            await rep.report(format_exc(), "warning")
+            return None
+        if member.status in (ChatMemberStatus.LEFT, ChatMemberStatus.BANNED):
+            return False
+        self.__members.set((uid, chat_id), True)
+        return True
+
+    async def statuses(self, uid):
+        return dict(zip(Var.FSUB_CHATS, await gather(*(self.__check(uid, chat_id) for chat_id in Var.FSUB_CHATS))))
+
+    async def is_subbed(self, uid):
+        return all(joined is not False for joined in (await self.statuses(uid)).values())
+
+    async def chat_info(self, chat_id, invite=False):
+        """Cached (title, invite link), one reusable link is created per chat on first need."""
+        title, link = self.__chats.get(chat_id, (None, None))
+        if title is None:
+            title = (await bot.get_chat(chat_id)).title
+        if invite and link is None:
+            link = (await bot.create_chat_invite_link(chat_id=chat_id)).invite_link
+        self.__chats[chat_id] = (title, link)
+        return title, link
+
+    def invalidate(self, uid=None, chat_id=None):
+        if uid is None:
+            self.__members.clear()
+            if chat_id is not None:
+                self.__chats.pop(chat_id, None)
+        else:
+            self.__members.pop((uid, chat_id))
+
+fsubs = FSubChecker(Var.FSUB_TTL)
@@ -4,8 +4,8 @@ from functools import partial, wraps
 from json import loads as jloads
 from re import findall
 from math import floor
-from os import path as ospath
-from time import time, sleep
+from os import path as ospath, listdir
+from time import time
 from traceback import format_exc
 from asyncio import sleep as asleep, create_subprocess_shell
 from asyncio.subprocess import PIPE
@@ -13,15 +13,23 @@ from base64 import urlsafe_b64encode, urlsafe_b64decode
 
 from aiohttp import ClientSession
 from aiofiles import open as aiopen
+from aiofiles.os import remove as aioremove
 from aioshutil import rmtree as aiormtree
 from html_telegraph_poster import TelegraphPoster
 from feedparser import parse as feedparse
 from pyrogram.enums import ChatMemberStatus
+from pyrogram.filters import create
 from pyrogram.types import InlineKeyboardButton
-from pyrogram.errors import MessageNotModified, FloodWait, UserNotParticipant, ReplyMarkupInvalid, MessageIdInvalid
+from pyrogram.errors import MessageNotModified, ReplyMarkupInvalid, MessageIdInvalid
 
 from bot import bot, bot_loop, LOGS, Var
 from .reporter import rep
+from .msg_scheduler import msgsch
+from .fsub import fsubs
+
+# Read Var on every update, unlike filters.user/chat which copy their ids once, so /reload applies to them
+admins = create(lambda _, __, update: bool(update.from_user) and update.from_user.id in Var.ADMINS, "Admins")
+fsub_chats = create(lambda _, __, update: bool(update.chat) and update.chat.id in Var.FSUB_CHATS, "FSubChats")
 
 def handle_logs(func):
     @wraps(func)
@@ -84,15 +92,11 @@ async def get_telegraph(out):
 async def sendMessage(chat, text, buttons=None, get_error=False, **kwargs):
     try:
         if isinstance(chat, int):
-            return await bot.send_message(chat_id=chat, text=text, disable_web_page_preview=True,
-                                        disable_notification=False, reply_markup=buttons, **kwargs)
+            return await msgsch.run(chat, partial(bot.send_message, chat_id=chat, text=text, disable_web_page_preview=True,
+                                        disable_notification=False, reply_markup=buttons, **kwargs))
         else:
-            return await chat.reply(text=text, quote=True, disable_web_page_preview=True, disable_notification=False,
-                                    reply_markup=buttons, **kwargs)
-    except FloodWait as f:
-        await rep.report(f, "warning")
-        sleep(f.value * 1.2)
-        return await sendMessage(chat, text, buttons, get_error, **kwargs)
+            return await msgsch.run(chat.chat.id, partial(chat.reply, text=text, quote=True, disable_web_page_preview=True,
+                                    disable_notification=False, reply_markup=buttons, **kwargs))
     except ReplyMarkupInvalid:
         return await sendMessage(chat, text, None, get_error, **kwargs)
     except Exception as e:
@@ -105,12 +109,8 @@ async def editMessage(msg, text, buttons=None, get_error=False, **kwargs):
     try:
         if not msg:
             return None
-        return await msg.edit_text(text=text, disable_web_page_preview=True, 
-                                        reply_markup=buttons, **kwargs)
-    except FloodWait as f:
-        await rep.report(f, "warning")
-        sleep(f.value * 1.2)
-        return await editMessage(msg, text, buttons, get_error, **kwargs)
+        return await msgsch.run(msg.chat.id, partial(msg.edit_text, text=text, disable_web_page_preview=True, 
+                                        reply_markup=buttons, **kwargs), key=(msg.chat.id, msg.id))
     except ReplyMarkupInvalid:
         return await editMessage(msg, text, None, get_error, **kwargs)
     except (MessageNotModified, MessageIdInvalid):
@@ -130,32 +130,23 @@ async def decode(b64_str):
 async def is_fsubbed(uid):
     if len(Var.FSUB_CHATS) == 0:
         return True
-    for chat_id in Var.FSUB_CHATS:
-        try:
-            member = await bot.get_chat_member(chat_id=chat_id, user_id=uid)
-        except UserNotParticipant:
-            return False
-        except Exception as err:
-            await rep.report(format_exc(), "warning")
-            continue
-    return True
+    return await fsubs.is_subbed(uid)
         
 async def get_fsubs(uid, txtargs):
     txt = "<b><i>Please Join Following Channels to Use this Bot!</i></b>\n\n"
     btns = []
-    for no, chat in enumerate(Var.FSUB_CHATS, start=1):
+    for no, (chat, joined) in enumerate((await fsubs.statuses(uid)).items(), start=1):
         try:
-            cha = await bot.get_chat(chat)
-            member = await bot.get_chat_member(chat_id=chat, user_id=uid)
-            sta = "Joined ✅️"
-        except UserNotParticipant:
-            sta = "Not Joined ❌️"
-            inv = await bot.create_chat_invite_link(chat_id=chat)
-            btns.append([InlineKeyboardButton(cha.title, url=inv.invite_link)])
+            title, link = await fsubs.chat_info(chat, invite=joined is False)
         except Exception as err:
             await rep.report(format_exc(), "warning")
             continue
-        txt += f"<b>{no}. Title :</b> <i>{cha.title}</i>\n  <b>Status :</b> <i>{sta}</i>\n\n"
+        if joined is False:
+            sta = "Not Joined ❌️"
+            btns.append([InlineKeyboardButton(title, url=link)])
+        else:
+            sta = "Joined ✅️"
+        txt += f"<b>{no}. Title :</b> <i>{title}</i>\n  <b>Status :</b> <i>{sta}</i>\n\n"
     if len(txtargs) > 1:
         btns.append([InlineKeyboardButton('🗂 Get Files', url=f'https://t.me/{(await bot.get_me()).username}?start={txtargs[1]}')])
     return txt, btns
@@ -177,11 +168,22 @@ async def mediainfo(file, get_json=False, get_duration=False):
         await rep.report(format_exc(), "error")
         return ""
         
-async def clean_up():
-    try:
-        (await aiormtree(dirtree) for dirtree in ("downloads", "thumbs", "encode"))
-    except Exception as e:
-        LOGS.error(str(e))
+async def clean_up(keep=()):
+    """Empties the work directories, except the workspaces of the job ids in keep that get resumed later."""
+    keep = {str(job_id) for job_id in keep}
+    for dirtree in ("downloads", "thumbs", "encode"):
+        if not ospath.isdir(dirtree):
+            continue
+        for name in listdir(dirtree):
+            if name in keep:
+                continue
+            try:
+                if ospath.isdir(path := ospath.join(dirtree, name)):
+                    await aiormtree(path)
+                else:
+                    await aioremove(path)
+            except Exception as e:
+                LOGS.error(str(e))
 
 def convertTime(s: int) -> str:
     m, s = divmod(int(s), 60)
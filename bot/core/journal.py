@@ -0,0 +1,42 @@
+from time import time
+from traceback import format_exc
+
+from bot import LOGS
+from .database import db
+
+STAGES = ('queued', 'downloaded', 'encoded', 'uploaded', 'published')
+
+def reached(state, stage):
+    """True if a journaled quality state is at or past stage."""
+    return STAGES.index((state or {}).get('stage', 'queued')) >= STAGES.index(stage)
+
+class JobJournal:
+    """Mongo record of every unfinished job and the stage each of its qualities reached."""
+    async def __save(self, job_id, fields):
+        try:
+            await db.saveJob(job_id, fields)
+        except Exception:
+            LOGS.error(format_exc())
+
+    async def add(self, job):
+        await self.__save(job.post_id, {'name': job.name, 'torrent': job.torrent, 'stat_id': job.stat_msg.id,
+                                        'stage': 'queued', 'quals': {}, 'created_at': time()})
+
+    async def downloaded(self, job, source):
+        await self.__save(job.post_id, {'stage': 'downloaded', 'source': source})
+
+    async def update(self, job, qual, stage, **fields):
+        state = job.stages.setdefault(qual, {})
+        state.update(stage=stage, **fields)
+        await self.__save(job.post_id, {f"quals.{qual}.{key}": value for key, value in state.items()})
+
+    async def remove(self, job):
+        try:
+            await db.removeJob(job.post_id)
+        except Exception:
+            LOGS.error(format_exc())
+
+    async def pending(self):
+        return await db.getJobs()
+
+journal = JobJournal()
@@ -0,0 +1,70 @@
+from time import time
+from asyncio import shield, sleep as asleep
+from pyrogram.errors import FloodWait
+
+from bot import Var, LOGS, bot_loop
+from .ratelimit import TokenBucket
+
+class MessageScheduler:
+    """Runs Telegram sends and edits within global and per-chat budgets, an edit still waiting for its turn is replaced by a newer one."""
+    def __init__(self, global_rate, chat_rate, private_rate=60, private_burst=3):
+        self.__global = TokenBucket(global_rate, per=1, name="Telegram")
+        self.__intervals = ((60 / chat_rate, 1), (60 / private_rate, private_burst))
+        self.__chats = {}
+        self.__pending = {}
+
+    def __interval(self, chat_id):
+        """(spacing, burst) of a chat, a deep link click sends a few messages to its private chat at once."""
+        return self.__intervals[1] if isinstance(chat_id, int) and chat_id > 0 else self.__intervals[0]
+
+    async def __wait_chat(self, chat_id):
+        # Each chat holds the time its schedule is booked up to, up to burst - 1 spacings may be booked ahead
+        interval, burst = self.__interval(chat_id)
+        while (delay := self.__chats.get(chat_id, 0) - time() - (burst - 1) * interval) > 0:
+            await asleep(delay)
+        self.__chats[chat_id] = max(self.__chats.get(chat_id, 0), time()) + interval
+
+    def prune(self):
+        """Forgets chats whose spacing has already elapsed, one entry per user accumulates otherwise."""
+        now = time()
+        self.__chats = {chat_id: at for chat_id, at in self.__chats.items() if at > now}
+
+    async def run(self, chat_id, func, key=None):
+        """Runs the coroutine function func once budgets allow, calls sharing a pending key get the latest call's result."""
+        if key is not None and (entry := self.__pending.get(key)):
+            entry[1] = func
+            return await shield(entry[0])
+        entry = [bot_loop.create_future(), func]
+        if key is not None:
+            self.__pending[key] = entry
+        bot_loop.create_task(self.__execute(chat_id, key, entry))
+        return await shield(entry[0])
+
+    async def __execute(self, chat_id, key, entry):
+        fut = entry[0]
+        try:
+            while True:
+                await self.__wait_chat(chat_id)
+                await self.__global.acquire()
+                if key is not None and self.__pending.get(key) is entry:
+                    del self.__pending[key]
+                try:
+                    result = await entry[1]()
+                except FloodWait as f:
+                    # Retry later without blocking the loop, newer edits may still replace this one meanwhile
+                    LOGS.warning(f"FloodWait of {f.value}s in {chat_id}, Rescheduled")
+                    interval, burst = self.__interval(chat_id)
+                    self.__chats[chat_id] = max(self.__chats.get(chat_id, 0), time() + f.value * 1.2 + (burst - 1) * interval)
+                    if key is not None:
+                        self.__pending.setdefault(key, entry)
+                    continue
+                if not fut.done():
+                    fut.set_result(result)
+                return
+        except Exception as e:
+            if key is not None and self.__pending.get(key) is entry:
+                del self.__pending[key]
+            if not fut.done():
+                fut.set_exception(e)
+
+msgsch = MessageScheduler(Var.TG_RATE, Var.TG_CHAT_RATE)
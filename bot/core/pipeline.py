@@ -0,0 +1,342 @@
+from asyncio import Queue, Event, sleep as asleep
+from os import path as ospath
+from traceback import format_exc
+from aiofiles.os import remove as aioremove
+from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot import bot, bot_loop, Var, LOGS
+from .tordownload import TorDownloader
+from .episode_store import epstore
+from .database import db
+from .distributor import distributor
+from .routing import router
+from .func_utils import encode, editMessage, sendMessage
+from .ffencoder import FFEncoder, FFMultiEncoder
+from .ffpool import ffpool
+from .workspace import JobWorkspace
+from .tguploader import TgUploader
+from .upload_pool import uppool
+from .journal import journal, reached
+from .text_utils import TextEditor
+from .schedule import shdr
+from .reporter import rep
+
+BTN_LABELS = {
+    '1080':'ⓉⓌ•1080p',
+    '720':'ⓉⓌ•720p',
+    '480':'ⓉⓌ•480p',
+    'Hdrip':'ⓉⓌ•HDRip'
+}
+btn_formatter = {}
+
+def load_btn_formatter():
+    """(Re)builds btn_formatter in place for every quality in Var.QUALS."""
+    btn_formatter.clear()
+    btn_formatter.update(BTN_LABELS)
+    for qual in Var.QUALS:
+        btn_formatter.setdefault(qual, f"ⓉⓌ•{qual}{'p' if qual.isdigit() else ''}")
+
+load_btn_formatter()
+
+class AnimeJob:
+    def __init__(self, name, torrent, aniInfo, post_msg, stat_msg):
+        self.name = name
+        self.torrent = torrent
+        self.aniInfo = aniInfo
+        self.ani_id = aniInfo.adata.get('id')
+        self.ep_no = aniInfo.pdata.get("episode_number")
+        self.post_msg = post_msg
+        self.stat_msg = stat_msg
+        self.workspace = JobWorkspace(post_msg.id)
+        self.downloader = None
+        self.torrent_file = None
+        self.stream = None
+        self.downloaded = Event()
+        self.links = {}
+        self.failed = False
+        self.encoded = False
+        self.uploads = 0
+        self.stages = {}
+        self.resumed = False
+        # Forced /addtask jobs may run without the episode claim, only its owner releases it
+        self.claimed = False
+
+    @property
+    def post_id(self):
+        return self.post_msg.id
+
+    def buttons(self):
+        """Post buttons in Var.QUALS order, two per row, whatever order the uploads finished in."""
+        btns = []
+        for qual in Var.QUALS:
+            if not (link := self.links.get(qual)):
+                continue
+            if btns and len(btns[-1]) == 1:
+                btns[-1].append(InlineKeyboardButton(btn_formatter.get(qual, qual), url=link))
+            else:
+                btns.append([InlineKeyboardButton(btn_formatter.get(qual, qual), url=link)])
+        return btns
+
+    def done(self, qual):
+        """True if the quality needs no encode, its output is on disk or it already went past the upload."""
+        state = self.stages.get(qual)
+        return reached(state, 'uploaded') or (reached(state, 'encoded') and ospath.exists(state.get('path', '')))
+
+    @classmethod
+    async def restore(cls, doc):
+        """Rebuilds a journaled job, None if its post is gone."""
+        aniInfo = TextEditor(doc['name'])
+        await aniInfo.load_anilist()
+        post_msg, stat_msg = await bot.get_messages(Var.MAIN_CHANNEL, message_ids=[doc['_id'], doc['stat_id']])
+        if post_msg.empty:
+            return None
+        if stat_msg.empty:
+            stat_msg = await sendMessage(Var.MAIN_CHANNEL, f"‣ <b>Anime Name :</b> <b><i>{doc['name']}</i></b>\n\n<i>Resuming...</i>")
+        job = cls(doc['name'], doc['torrent'], aniInfo, post_msg, stat_msg)
+        job.stages = doc.get('quals') or {}
+        job.links = {qual: state['link'] for qual, state in job.stages.items() if reached(state, 'published') and state.get('link')}
+        job.resumed = True
+        if doc.get('stage') == 'downloaded' and ospath.exists(source := doc.get('source') or ""):
+            job.workspace.set_source(source)
+        return job
+
+class Pipeline:
+    def __init__(self):
+        self.__dl_queue = Queue(maxsize=Var.DL_QUEUE)
+        self.__ff_queue = Queue(maxsize=Var.FF_QUEUE)
+        self.__up_queue = Queue(maxsize=Var.UP_QUEUE)
+        self.__jobs = set()
+        self.__workers = []
+
+    def start(self):
+        if self.__workers:
+            return
+        for _ in range(Var.DL_WORKERS):
+            self.__workers.append(bot_loop.create_task(self.__download_worker()))
+        # One worker per encode the pool can admit at once, cheap qualities share a slot by cost
+        for _ in range(ffpool.capacity):
+            self.__workers.append(bot_loop.create_task(self.__encode_worker()))
+        encoders = len(self.__workers) - Var.DL_WORKERS
+        for _ in range(uppool.size):
+            self.__workers.append(bot_loop.create_task(self.__upload_worker()))
+        LOGS.info(f"Pipeline Started : {Var.DL_WORKERS} Downloader(s), {encoders} Encoder(s), {uppool.size} Uploader(s)")
+
+    @property
+    def busy(self):
+        return bool(self.__jobs)
+
+    async def submit(self, job):
+        self.__jobs.add(job)
+        if not job.resumed:
+            await journal.add(job)
+        elif job.workspace.source or all(job.done(qual) for qual in Var.QUALS):
+            # Resume at the first incomplete stage, the encoder skips what is already done
+            job.downloaded.set()
+            await self.__ff_queue.put(job)
+            return
+        await self.__dl_queue.put(job)
+
+    async def resume(self):
+        """Re-queues the jobs journaled before a crash or restart."""
+        for doc in await journal.pending():
+            try:
+                if not (job := await AnimeJob.restore(doc)):
+                    await db.removeJob(doc['_id'])
+                    continue
+            except Exception:
+                await rep.report(format_exc(), "error")
+                continue
+            job.claimed = epstore.claim(job.ani_id, job.ep_no)
+            await rep.report(f"Resuming Task : {job.name}", "info")
+            await self.submit(job)
+
+    async def __finish(self, job):
+        if job.downloader:
+            await job.downloader.cancel()
+        try:
+            await job.stat_msg.delete()
+        except Exception:
+            pass
+        await job.workspace.cleanup()
+        await journal.remove(job)
+        if job.claimed:
+            epstore.release(job.ani_id, job.ep_no)
+        self.__jobs.discard(job)
+
+    async def __download_worker(self):
+        while True:
+            job = await self.__dl_queue.get()
+            try:
+                await editMessage(job.stat_msg, f"‣ <b>Anime Name :</b> <b><i>{job.name}</i></b>\n\n<i>Downloading...</i>")
+                job.downloader = TorDownloader(job.workspace.dl_dir, job.stat_msg, stream=Var.STREAM_ENCODE)
+                if Var.STREAM_ENCODE:
+                    dl_task = bot_loop.create_task(job.downloader.download(job.torrent, job.name))
+                    if stream := await job.downloader.wait_stream():
+                        # Hand the job to the encoders now, they read the file while it downloads
+                        job.stream = stream
+                        job.workspace.set_source(stream.path)
+                        await self.__ff_queue.put(job)
+                    job.torrent_file = await dl_task
+                else:
+                    job.torrent_file = await job.downloader.download(job.torrent, job.name)
+                if not (dl := job.torrent_file) or not ospath.exists(dl.path) or not job.workspace.set_source(dl.path):
+                    await rep.report(f"File Download Incomplete, Try Again", "error")
+                    if job.stream:
+                        job.failed = True
+                    else:
+                        await self.__finish(job)
+                    continue
+                await journal.downloaded(job, job.workspace.source)
+                if job.stream:
+                    continue
+                if ffpool.busy or self.__ff_queue.full():
+                    await editMessage(job.stat_msg, f"‣ <b>Anime Name :</b> <b><i>{job.name}</i></b>\n\n<i>Queued to Encode...</i>")
+                    await rep.report("Added Task to Queue...", "info")
+                await self.__ff_queue.put(job)
+            except Exception:
+                await rep.report(format_exc(), "error")
+                if job.stream:
+                    job.failed = True
+                else:
+                    await self.__finish(job)
+            finally:
+                job.downloaded.set()
+                self.__dl_queue.task_done()
+
+    async def __encode_worker(self):
+        while True:
+            job = await self.__ff_queue.get()
+            try:
+                await self.__encode(job)
+            except Exception:
+                job.failed = True
+                await rep.report(format_exc(), "error")
+            finally:
+                if job.failed and job.downloader:
+                    await job.downloader.cancel()
+                # End marker, the uploader finishes the job once every quality before it is published
+                await self.__up_queue.put((job, None, None))
+                self.__ff_queue.task_done()
+
+    async def __stream_encode(self, job):
+        quals = [qual for qual in Var.QUALS if not job.done(qual)]
+        quals = quals if Var.MULTI_ENCODE else quals[:1]
+        if not quals:
+            return {}
+        try:
+            async with ffpool.slot(job.post_id, *quals) as threads:
+                await editMessage(job.stat_msg, f"‣ <b>Anime Name :</b> <b><i>{job.name}</i></b>\n\n<i>Encoding while Downloading...</i>")
+                await rep.report("Starting Streaming Encode...", "info")
+                if len(quals) > 1:
+                    return await FFMultiEncoder(job.stat_msg, job.workspace, {qual: await job.aniInfo.get_upname(qual) for qual in quals}, threads, job.stream).start_encode() or {}
+                out_path = await FFEncoder(job.stat_msg, job.workspace, await job.aniInfo.get_upname(quals[0]), quals[0], threads, job.stream).start_encode()
+                return {quals[0]: out_path} if out_path else {}
+        except Exception as e:
+            await rep.report(f"Error: {e}, Streaming Encode Failed, Encoding after Download !", "warning")
+        return {}
+
+    async def __encode(self, job):
+        out_paths = {}
+        if job.stream:
+            out_paths = await self.__stream_encode(job)
+            if not out_paths:
+                await editMessage(job.stat_msg, f"‣ <b>Anime Name :</b> <b><i>{job.name}</i></b>\n\n<i>Waiting for Download...</i>")
+            await job.downloaded.wait()
+        todo = [qual for qual in Var.QUALS if not job.done(qual) and qual not in out_paths]
+        if Var.MULTI_ENCODE and len(todo) > 1 and not out_paths and not job.failed:
+            try:
+                async with ffpool.slot(job.post_id, *todo) as threads:
+                    await editMessage(job.stat_msg, f"‣ <b>Anime Name :</b> <b><i>{job.name}</i></b>\n\n<i>Ready to Encode...</i>")
+                    await rep.report("Starting Encode...", "info")
+                    out_paths = await FFMultiEncoder(job.stat_msg, job.workspace, {qual: await job.aniInfo.get_upname(qual) for qual in todo}, threads).start_encode() or {}
+            except Exception as e:
+                await rep.report(f"Error: {e}, Falling back to Encode per Quality !", "error")
+        for qual in Var.QUALS:
+            if job.failed:
+                return
+            if job.done(qual):
+                job.uploads += 1
+                await self.__up_queue.put((job, qual, job.stages[qual].get('path')))
+                continue
+            filename = await job.aniInfo.get_upname(qual)
+            try:
+                if not (out_path := out_paths.get(qual)):
+                    async with ffpool.slot(job.post_id, qual) as threads:
+                        await editMessage(job.stat_msg, f"‣ <b>Anime Name :</b> <b><i>{job.name}</i></b>\n\n<i>Ready to Encode...</i>")
+                        await asleep(1.5)
+                        await rep.report("Starting Encode...", "info")
+                        out_path = await FFEncoder(job.stat_msg, job.workspace, filename, qual, threads).start_encode()
+                if not out_path:
+                    raise Exception(f"Encoding of {qual} Failed")
+            except Exception as e:
+                await rep.report(f"Error: {e}, Cancelled,  Retry Again !", "error")
+                job.failed = True
+                return
+            await journal.update(job, qual, 'encoded', path=out_path)
+            await rep.report("Succesfully Compressed Now Going To Upload...", "info")
+            job.uploads += 1
+            await self.__up_queue.put((job, qual, out_path))
+
+    async def __upload_worker(self):
+        while True:
+            job, qual, out_path = await self.__up_queue.get()
+            try:
+                if qual is None:
+                    job.encoded = True
+                else:
+                    try:
+                        if job.failed:
+                            if out_path and ospath.exists(out_path):
+                                await aioremove(out_path)
+                        else:
+                            await self.__upload(job, qual, out_path)
+                    finally:
+                        job.uploads -= 1
+                # Several uploaders run at once, the last one out finishes the job
+                if job.encoded and not job.uploads:
+                    await self.__finish(job)
+            except Exception:
+                await rep.report(format_exc(), "error")
+            finally:
+                self.__up_queue.task_done()
+
+    async def __upload(self, job, qual, out_path):
+        state = job.stages.get(qual)
+        if reached(state, 'published'):
+            return
+        if reached(state, 'uploaded'):
+            msg_id = state['msg_id']
+        else:
+            await editMessage(job.stat_msg, f"‣ <b>Anime Name :</b> <b><i>{ospath.basename(out_path)}</i></b>\n\n<i>Ready to Upload...</i>")
+            await asleep(1.5)
+            try:
+                msg = await TgUploader(job.stat_msg).upload(out_path, qual)
+            except Exception as e:
+                await rep.report(f"Error: {e}, Cancelled,  Retry Again !", "error")
+                job.failed = True
+                return
+            await rep.report("Succesfully Uploaded File into Tg...", "info")
+            msg_id = msg.id
+            await journal.update(job, qual, 'uploaded', msg_id=msg_id)
+
+        link = f"https://telegram.me/{(await bot.get_me()).username}?start={await encode('get-'+str(msg_id * abs(Var.FILE_STORE)))}"
+
+        job.links[qual] = link
+        if job.post_msg:
+            await editMessage(job.post_msg, job.post_msg.caption.html if job.post_msg.caption else "", InlineKeyboardMarkup(job.buttons()))
+
+        await epstore.save(job.ani_id, job.ep_no, qual, job.post_id)
+        await journal.update(job, qual, 'published', link=link)
+        if job.post_msg:
+            bot_loop.create_task(shdr.mark(job.post_msg.link, ani_id=job.ani_id, name=job.aniInfo.pdata.get('anime_title')))
+        bot_loop.create_task(distributor.distribute(msg_id, self.__targets(job), ospath.basename(out_path or "") or job.name))
+
+    def __targets(self, job):
+        targets = Var.BACKUP_CHANNEL.split()
+        adata = job.aniInfo.adata
+        names = (*(adata.get('title') or {}).values(), *(adata.get('synonyms') or []), job.aniInfo.pdata.get('anime_title'))
+        if channel_id := router.resolve(job.ani_id, names):
+            targets.append(channel_id)
+        return targets
+
+pipeline = Pipeline()
@@ -0,0 +1,74 @@
+from time import time
+from random import uniform
+from collections import deque
+from asyncio import sleep as asleep
+
+from bot import Var, bot_loop, LOGS
+
+class TokenBucket:
+    HIGH, LOW = 0, 1
+
+    def __init__(self, rate, per=60, name="bucket"):
+        self.__name = name
+        self.__capacity = rate
+        self.__rate = rate / per
+        self.__tokens = float(rate)
+        self.__updated = time()
+        self.__blocked_until = 0
+        self.__lanes = (deque(), deque())
+        self.__dispatcher = None
+
+    def __refill(self):
+        now = time()
+        self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+        return now
+
+    async def acquire(self, priority=HIGH):
+        fut = bot_loop.create_future()
+        self.__lanes[priority].append(fut)
+        if self.__dispatcher is None or self.__dispatcher.done():
+            self.__dispatcher = bot_loop.create_task(self.__dispatch())
+        await fut
+
+    def __next_waiter(self):
+        for lane in self.__lanes:
+            while lane:
+                if not (fut := lane.popleft()).done():
+                    return fut
+        return None
+
+    async def __dispatch(self):
+        while any(self.__lanes):
+            now = self.__refill()
+            if now < self.__blocked_until:
+                await asleep(self.__blocked_until - now)
+                continue
+            if self.__tokens < 1:
+                await asleep((1 - self.__tokens) / self.__rate)
+                continue
+            if (fut := self.__next_waiter()) is None:
+                break
+            self.__tokens -= 1
+            fut.set_result(True)
+
+    def update(self, status, headers):
+        """Adjusts pacing from the X-RateLimit-* / Retry-After headers of a response."""
+        self.__refill()
+        if (limit := headers.get('X-RateLimit-Limit', '')).isdigit() and int(limit) != self.__capacity:
+            self.__capacity = int(limit)
+            self.__rate = self.__capacity / 60
+        if (remaining := headers.get('X-RateLimit-Remaining', '')).isdigit():
+            self.__tokens = min(self.__tokens, int(remaining))
+            if int(remaining) == 0 and (reset := headers.get('X-RateLimit-Reset', '')).isdigit():
+                self.__blocked_until = max(self.__blocked_until, int(reset))
+        if status == 429:
+            retry_after = int(r) if (r := headers.get('Retry-After', '')).isdigit() else 60
+            self.__tokens = 0
+            self.__blocked_until = max(self.__blocked_until, time() + retry_after)
+            LOGS.warning(f"{self.__name} Rate Limited, Pausing for {retry_after}s")
+
+def backoff(attempt, base=2, cap=60):
+    return min(cap, base ** attempt) * uniform(0.5, 1.5)
+
+anilimiter = TokenBucket(Var.ANI_RATE, name="AniList")
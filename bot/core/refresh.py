@@ -0,0 +1,58 @@
+from os import path as ospath, replace
+from asyncio import create_subprocess_exec
+from aiofiles.os import remove as aioremove
+
+from bot import Var, LOGS, reload_vars
+from .ffencoder import load_ffargs
+from .benchmark import load_tuned, drop_tuned
+from .pipeline import load_btn_formatter
+from .episode_store import epstore
+from .auto_delete import autodel
+from .routing import router
+from .fsub import fsubs
+from .msg_scheduler import msgsch
+from .anilist_cache import anicache
+from .reporter import rep
+
+# Read once by long-lived clients, pools and workers, these only apply after a /restart
+RESTART_VARS = ('API_ID', 'API_HASH', 'BOT_TOKEN', 'MONGO_URI', 'UPLOAD_TOKENS', 'ARIA2_PORT', 'ARIA2_SECRET', 'ARIA2_MAX_DL',
+                'DL_WORKERS', 'DL_QUEUE', 'FF_QUEUE', 'UP_QUEUE', 'FF_SLOTS', 'FF_THREADS', 'FF_COSTS', 'TG_RATE', 'TG_CHAT_RATE',
+                'ANI_RATE', 'ANI_CACHE_SIZE', 'EP_CACHE_SIZE', 'DELIVERY_CACHE', 'FSUB_TTL', 'REPORT_INTERVAL', 'REPORT_QUEUE')
+
+async def load_thumb():
+    """Swaps thumb.jpg for Var.THUMB, the old one stays if the download fails."""
+    if not Var.THUMB:
+        if ospath.exists("thumb.jpg"):
+            await aioremove("thumb.jpg")
+        return
+    if await (await create_subprocess_exec("wget", "-q", Var.THUMB, "-O", "thumb.tmp")).wait() == 0 and ospath.getsize("thumb.tmp"):
+        replace("thumb.tmp", "thumb.jpg")
+        LOGS.info("Thumbnail has been Updated!!")
+    elif ospath.exists("thumb.tmp"):
+        await aioremove("thumb.tmp")
+
+async def refresh():
+    """Reloads config.env and rebuilds what derives from it in place, returns (changed vars, vars needing a restart)."""
+    changed = reload_vars()
+    if quals := [key.removeprefix('FFCODE_') for key in changed if key.startswith('FFCODE_')]:
+        # A tuned profile would win over the new template, the admin re-runs /benchmark on it if wanted
+        await drop_tuned(quals)
+        load_ffargs()
+        await load_tuned()
+    if 'QUALS' in changed:
+        load_btn_formatter()
+    if 'FSUB_CHATS' in changed:
+        fsubs.invalidate()
+    if 'LOG_CHANNEL' in changed:
+        rep.retarget(Var.LOG_CHANNEL)
+    if 'ANI_STABLE_TTL' in changed or 'ANI_VOLATILE_TTL' in changed:
+        anicache.stable_ttl, anicache.volatile_ttl = Var.ANI_STABLE_TTL, Var.ANI_VOLATILE_TTL
+    if 'THUMB' in changed:
+        await load_thumb()
+    await router.load()
+    msgsch.prune()
+    await epstore.flush()
+    await autodel.flush()
+    await rep.flush()
+    LOGS.info(f"Refreshed, Changed Var(s) : {', '.join(changed) or 'None'}")
+    return changed, [key for key in changed if key in RESTART_VARS]
@@ -1,12 +1,25 @@
-from time import sleep
-from pyrogram.errors import FloodWait
-from bot import Var, LOGS, bot
+from collections import deque
+from functools import partial
+from asyncio import sleep as asleep
+from bot import Var, LOGS, bot, bot_loop
+from .msg_scheduler import msgsch
+
+MAX_LEN = 4096
 
 class Reporter:
-    def __init__(self, client, chat_id, log):
+    def __init__(self, client, chat_id, log, interval=10, maxsize=200):
         self.__client = client
         self.__cid = chat_id
         self.__logger = log
+        self.__interval = interval
+        self.__queue = deque()
+        self.__maxsize = maxsize
+        self.__dropped = 0
+        self.__flusher = None
+
+    def retarget(self, chat_id):
+        """Points reports at another chat, 0 keeps them in the logs only."""
+        self.__cid = chat_id
 
     async def report(self, msg, log_type, log=True):
         txt = [f"[{log_type.upper()}] {msg}", log_type.lower()]
@@ -18,13 +31,39 @@ class Reporter:
             self.__logger.critical(txt[0])
         else:
             self.__logger.info(txt[0])
-        if log and self.__cid != 0:
-            try:
-                await self.__client.send_message(self.__cid, f"{txt[0][:4096]}")
-            except FloodWait as f:
-                self.__logger.warning(str(f))
-                sleep(f.value * 1.5)
-            except Exception as err:
-                self.__logger.error(str(err))
-
-rep = Reporter(bot, Var.LOG_CHANNEL, LOGS)
+        if not log or self.__cid == 0:
+            return
+        if txt[1] in ("error", "critical"):
+            bot_loop.create_task(self.__send(txt[0][:MAX_LEN]))
+            return
+        if len(self.__queue) >= self.__maxsize:
+            self.__queue.popleft()
+            self.__dropped += 1
+        self.__queue.append(txt[0][:MAX_LEN])
+        if self.__flusher is None or self.__flusher.done():
+            self.__flusher = bot_loop.create_task(self.__flush_later())
+
+    async def __send(self, text):
+        try:
+            await msgsch.run(self.__cid, partial(self.__client.send_message, self.__cid, text))
+        except Exception as err:
+            self.__logger.error(str(err))
+
+    async def __flush_later(self):
+        await asleep(self.__interval)
+        await self.flush()
+
+    async def flush(self):
+        """Sends the queued entries merged into as few messages as the length limit allows."""
+        batch = f"[WARNING] {self.__dropped} Log Entries Dropped" if self.__dropped else ""
+        self.__dropped = 0
+        while self.__queue:
+            entry = self.__queue.popleft()
+            if batch and len(batch) + len(entry) + 2 > MAX_LEN:
+                await self.__send(batch)
+                batch = ""
+            batch = f"{batch}\n\n{entry}" if batch else entry
+        if batch:
+            await self.__send(batch)
+
+rep = Reporter(bot, Var.LOG_CHANNEL, LOGS, Var.REPORT_INTERVAL, Var.REPORT_QUEUE)
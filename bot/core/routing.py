@@ -0,0 +1,52 @@
+from bot import LOGS
+from .database import db
+from .anilist_cache import anicache, normalize_name
+
+class ChannelRouter:
+    """In-memory alias map of AniList ids and normalized titles/synonyms -> per-anime channel set by /setchannel."""
+    def __init__(self):
+        self.__mappings = {}
+        self.__aliases = {}
+
+    async def __expand(self, name, channel_id):
+        aliases = {normalize_name(name): channel_id}
+        if name.isdigit():
+            aliases[int(name)] = channel_id
+            data, _ = await anicache.get(ani_id=int(name))
+        else:
+            data, _ = await anicache.get(name=name)
+        if data:
+            aliases[data['id']] = channel_id
+            for title in (*(data.get('title') or {}).values(), *(data.get('synonyms') or [])):
+                if title:
+                    aliases.setdefault(normalize_name(title), channel_id)
+        return aliases
+
+    async def load(self):
+        self.__mappings = await db.get_all_separate_channels()
+        aliases = {}
+        for name, channel_id in self.__mappings.items():
+            for key, value in (await self.__expand(name, channel_id)).items():
+                aliases.setdefault(key, value)
+        self.__aliases = aliases
+        LOGS.info(f"Channel Routes Loaded : {len(self.__mappings)} Mapping(s), {len(aliases)} Alias(es)")
+
+    async def set(self, name, channel_id):
+        await db.set_separate_channel(name, channel_id)
+        await self.load()
+
+    async def remove(self, name):
+        await db.remove_separate_channel(name)
+        await self.load()
+
+    def resolve(self, ani_id=None, names=()):
+        if ani_id is not None and (channel_id := self.__aliases.get(ani_id)):
+            return channel_id
+        for name in names:
+            if name and (channel_id := self.__aliases.get(normalize_name(name))):
+                if ani_id is not None:
+                    self.__aliases[ani_id] = channel_id
+                return channel_id
+        return None
+
+router = ChannelRouter()
@@ -0,0 +1,66 @@
+from json import loads as jloads
+from asyncio import Semaphore, gather
+
+from aiohttp import ClientSession
+from bot import Var
+from .text_utils import TextEditor
+from .anilist_cache import normalize_name
+from .ratelimit import anilimiter
+from .func_utils import sendMessage, editMessage
+
+SHDR_API = "https://subsplease.org/api/?f=schedule&h=true&tz=Asia/Kolkata"
+
+class DailySchedule:
+    """Builds the pinned daily schedule with concurrent AniList lookups and patches it as episodes get uploaded."""
+    def __init__(self):
+        self.__entries = []
+        self.__msg = None
+
+    async def __resolve(self, sem, title):
+        async with sem:
+            aname = TextEditor(title, priority=anilimiter.LOW)
+            await aname.load_anilist()
+        return aname.adata
+
+    def __render(self):
+        text = "<b>📆 Today's Anime Releases Schedule [IST]</b>\n\n"
+        for entry in self.__entries:
+            text += f''' <a href="https://subsplease.org/shows/{entry['page']}">{entry['title']}</a>\n    • <b>Time</b> : {entry['time']} hrs\n'''
+            if entry['link']:
+                text += f'''    • <b>Status</b> : ✅ <i>Uploaded</i>\n    • <b>Link</b> : <a href="{entry['link']}">Here</a>\n'''
+            text += "\n"
+        return text
+
+    async def post(self):
+        """Fetches today's schedule, resolves every title before rendering once, then sends and pins it."""
+        async with ClientSession() as ses:
+            res = await ses.get(SHDR_API)
+            aniContent = jloads(await res.text())["schedule"]
+        # Titles airing twice a day are looked up once, repeats and known names are answered by anicache
+        titles = list(dict.fromkeys(i["title"] for i in aniContent))
+        sem = Semaphore(max(Var.SHDR_WORKERS, 1))
+        adatas = dict(zip(titles, await gather(*(self.__resolve(sem, title) for title in titles))))
+        entries = []
+        for i in aniContent:
+            adata = adatas[i["title"]]
+            names = {normalize_name(n) for n in (i["title"], *(adata.get('title') or {}).values()) if n}
+            entries.append({'title': adata.get('title', {}).get('english') or i['title'], 'page': i['page'], 'time': i['time'],
+                            'id': adata.get('id'), 'names': names, 'link': None})
+        self.__entries = entries
+        self.__msg = await sendMessage(Var.MAIN_CHANNEL, self.__render(), get_error=True)
+        await (await self.__msg.pin()).delete()
+
+    async def mark(self, link, ani_id=None, name=None):
+        """Marks the matching shows as uploaded and edits the pinned post, a no-op when nothing changes."""
+        if not self.__msg:
+            return
+        key = normalize_name(name) if name else None
+        changed = False
+        for entry in self.__entries:
+            if entry['link'] != link and ((ani_id and entry['id'] == ani_id) or (key and key in entry['names'])):
+                entry['link'] = link
+                changed = True
+        if changed:
+            await editMessage(self.__msg, self.__render())
+
+shdr = DailySchedule()
@@ -0,0 +1,126 @@
+from time import time
+from os import path as ospath
+from asyncio import sleep as asleep
+from aiofiles import open as aiopen
+
+from bot import Var, LOGS
+from .aria2 import aria2, Aria2Error
+
+# Containers ffmpeg can demux front to back from a pipe, unlike mp4 with a trailing moov atom
+STREAM_EXTS = ('.mkv', '.webm', '.ts')
+CHUNK_SIZE = 1024 * 1024
+
+class StreamStalled(Exception):
+    pass
+
+def parse_size(size):
+    """Bytes in an aria2 size such as 64M or 512K."""
+    size, units = str(size).strip().upper(), {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    return int(float(size[:-1]) * units[size[-1]]) if size[-1:] in units else int(size)
+
+def contiguous_pieces(bitfield, first):
+    """Number of completed pieces from `first` on, out of an aria2 hex bitfield."""
+    if not bitfield:
+        return 0
+    bits = bin(int(bitfield, 16))[2:].zfill(len(bitfield) * 4)
+    end = bits.find('0', first)
+    return (len(bits) if end == -1 else end) - first
+
+class TorrentStream:
+    """A file of a running aria2 download that can be read from the start up to its contiguous frontier."""
+    def __init__(self, gid, path, offset, length):
+        self.gid = gid
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.window = parse_size(Var.STREAM_HEAD)
+        self.head = min(self.window, length)
+        self.movable = True
+        self.frontier = 0
+        self.complete = False
+        self.failed = False
+
+    @classmethod
+    def supported(cls, path):
+        return path.lower().endswith(STREAM_EXTS)
+
+    def apply(self, status):
+        if self.complete or status.get('status') == "complete":
+            self.frontier = self.length
+            return
+        if not (piece_len := int(status.get('pieceLength', 0))):
+            return
+        first = self.offset // piece_len
+        done = (first + contiguous_pieces(status.get('bitfield'), first)) * piece_len - self.offset
+        self.frontier = max(self.frontier, min(max(done, 0), self.length))
+
+    async def update(self):
+        if self.complete:
+            self.frontier = self.length
+            return
+        try:
+            await self.follow(await aria2.status(self.gid, ['status', 'bitfield', 'pieceLength']))
+        except Aria2Error:
+            pass
+
+    async def follow(self, status):
+        """Applies a status poll and moves the prioritized window once the frontier is halfway through it."""
+        self.apply(status)
+        if self.movable and self.head < self.length and self.head - self.window // 2 <= self.frontier < self.length:
+            await self.__advance()
+
+    async def __advance(self):
+        """Slides the prioritized window past the frontier, aria2 alone would go back to rarest-first after the head."""
+        head = min(self.frontier + self.window, self.length)
+        try:
+            await aria2.call("changeOption", self.gid, {'bt-prioritize-piece': f"head={head}"})
+        except Aria2Error as e:
+            LOGS.warning(f"Stream Window could not Move, Falling back at the Head : {e}")
+            self.movable = False
+            return
+        self.head = head
+
+    async def feed(self, writer):
+        """Pipes the file into writer front to back, waiting on the download frontier; drain() gives backpressure."""
+        pos, last, f = 0, time(), None
+        try:
+            while pos < self.length:
+                if self.failed:
+                    raise StreamStalled("Download Failed")
+                if pos >= self.frontier:
+                    await self.update()
+                    if pos < self.frontier:
+                        continue
+                    if not self.movable and self.frontier >= self.head:
+                        # Past a fixed head aria2 is back to rarest-first, holes would keep the slot waiting
+                        raise StreamStalled(f"Prioritized Head Used Up at {pos}/{self.length} Bytes")
+                    if time() - last > Var.STREAM_STALL:
+                        raise StreamStalled(f"No Progress for {Var.STREAM_STALL}s at {pos}/{self.length} Bytes")
+                    await asleep(1)
+                    continue
+                if f is None:
+                    f = await aiopen(self.path, 'rb')
+                await f.seek(pos)
+                if not (data := await f.read(min(CHUNK_SIZE, self.frontier - pos))):
+                    raise StreamStalled(f"Short Read at {pos} Bytes")
+                writer.write(data)
+                await writer.drain()
+                pos += len(data)
+                last = time()
+        finally:
+            if f is not None:
+                await f.close()
+            writer.close()
+
+async def feed_stream(stream, proc):
+    """Feeds a TorrentStream into an ffmpeg reading pipe:0, killing it and returning False if the stream stalls."""
+    try:
+        await stream.feed(proc.stdin)
+        return True
+    except (StreamStalled, BrokenPipeError, ConnectionResetError) as e:
+        LOGS.warning(f"Stream Encode Stopped : {ospath.basename(stream.path)} - {e}")
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        return False
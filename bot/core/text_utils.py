@@ -7,9 +7,13 @@ from anitopy import parse
 
 from bot import Var, bot
 from .ffencoder import ffargs
+from .anilist_cache import anicache
+from .ratelimit import anilimiter, backoff
 from .func_utils import handle_logs
 from .reporter import rep
 
+ANI_MAX_RETRIES = 5
+
 CAPTION_FORMAT = """
 <b>❖ ㊂ <i>{title}</i> ❖</b>
 <b>╭━━━━━━━━━━━━━━━⟡</b>
@@ -108,11 +112,13 @@ query ($id: Int, $search: String, $seasonYear: Int) {
 """
 
 class AniLister:
-    def __init__(self, anime_name: str, year: int) -> None:
+    def __init__(self, anime_name: str, year: int, ani_id: int = None, priority: int = anilimiter.HIGH) -> None:
         self.__api = "https://graphql.anilist.co"
         self.__ani_name = anime_name
         self.__ani_year = year
-        self.__vars = {'search' : self.__ani_name, 'seasonYear': self.__ani_year}
+        self.__ani_id = ani_id
+        self.__priority = priority
+        self.__vars = {'id': ani_id} if ani_id else {'search' : self.__ani_name, 'seasonYear': self.__ani_year}
     
     def __update_vars(self, year=True) -> None:
         if year:
@@ -122,52 +128,80 @@ class AniLister:
             self.__vars = {'search' : self.__ani_name}
     
     async def post_data(self):
-        async with ClientSession() as sess:
-            async with sess.post(self.__api, json={'query': ANIME_GRAPHQL_QUERY, 'variables': self.__vars}) as resp:
-                return (resp.status, await resp.json(), resp.headers)
+        await anilimiter.acquire(self.__priority)
+        try:
+            async with ClientSession() as sess:
+                async with sess.post(self.__api, json={'query': ANIME_GRAPHQL_QUERY, 'variables': self.__vars}) as resp:
+                    anilimiter.update(resp.status, resp.headers)
+                    return (resp.status, await resp.json(content_type=None), resp.headers)
+        except Exception as err:
+            await rep.report(f"AniList Request Failed: {err}", "warning", log=False)
+            return (0, {}, {})
+
+    async def __request(self):
+        for attempt in range(ANI_MAX_RETRIES):
+            res_code, resp_json, res_heads = await self.post_data()
+            if res_code == 429:
+                await rep.report(f"AniList API FloodWait, Retry {attempt + 1}/{ANI_MAX_RETRIES} !!", "warning", log=False)
+            elif res_code == 0 or res_code >= 500:
+                delay = backoff(attempt)
+                await rep.report(f"AniList Server API Error: {res_code}, Waiting {delay:.1f}s to Try Again !!", "error", log=False)
+                await asleep(delay)
+            else:
+                break
+        return res_code, resp_json, res_heads
         
     async def get_anidata(self):
-        res_code, resp_json, res_heads = await self.post_data()
-        while res_code == 404 and self.__ani_year > 2020:
+        res_code, resp_json, res_heads = await self.__request()
+        while res_code == 404 and not self.__ani_id and self.__ani_year > 2020:
             self.__update_vars()
             await rep.report(f"AniList Query Name: {self.__ani_name}, Retrying with {self.__ani_year}", "warning", log=False)
-            res_code, resp_json, res_heads = await self.post_data()
+            res_code, resp_json, res_heads = await self.__request()
         
-        if res_code == 404:
+        if res_code == 404 and not self.__ani_id:
             self.__update_vars(year=False)
-            res_code, resp_json, res_heads = await self.post_data()
+            res_code, resp_json, res_heads = await self.__request()
         
         if res_code == 200:
             return resp_json.get('data', {}).get('Media', {}) or {}
-        elif res_code == 429:
-            f_timer = int(res_heads['Retry-After'])
-            await rep.report(f"AniList API FloodWait: {res_code}, Sleeping for {f_timer} !!", "error")
-            await asleep(f_timer)
-            return await self.get_anidata()
-        elif res_code in [500, 501, 502]:
-            await rep.report(f"AniList Server API Error: {res_code}, Waiting 5s to Try Again !!", "error")
-            await asleep(5)
-            return await self.get_anidata()
         else:
             await rep.report(f"AniList API Error: {res_code}", "error", log=False)
             return {}
     
 class TextEditor:
-    def __init__(self, name):
+    def __init__(self, name, priority=anilimiter.HIGH):
         self.__name = name
+        self.__priority = priority
         self.adata = {}
         self.pdata = parse(name)
 
     async def load_anilist(self):
+        # Cache then network per variant in order, a season-less variant would otherwise hit the earlier season's entry
         cache_names = []
         for option in [(False, False), (False, True), (True, False), (True, True)]:
             ani_name = await self.parse_name(*option)
-            if ani_name in cache_names:
+            if not ani_name or ani_name in cache_names:
                 continue
             cache_names.append(ani_name)
-            self.adata = await AniLister(ani_name, datetime.now().year).get_anidata()
+            if await self.__load_cached(ani_name):
+                return
+            self.adata = await AniLister(ani_name, datetime.now().year, priority=self.__priority).get_anidata()
             if self.adata:
-                break
+                await anicache.put(ani_name, self.adata)
+                return
+
+    async def __load_cached(self, ani_name):
+        if not ani_name:
+            return False
+        adata, refresh = await anicache.get(ani_name)
+        if not adata:
+            return False
+        if refresh:
+            if fresh := await AniLister(ani_name, datetime.now().year, ani_id=adata['id'], priority=self.__priority).get_anidata():
+                await anicache.put(ani_name, fresh, volatile_only=True)
+                adata = fresh
+        self.adata = adata
+        return True
 
     @handle_logs
     async def get_id(self):
@@ -1,12 +1,14 @@
-from time import time, sleep
+from time import time
 from traceback import format_exc
 from math import floor
+from functools import partial
 from os import path as ospath
 from aiofiles.os import remove as aioremove
-from pyrogram.errors import FloodWait
 
 from bot import bot, Var
 from .func_utils import editMessage, sendMessage, convertBytes, convertTime
+from .upload_pool import uppool
+from .delivery import delivery
 from .reporter import rep
 
 class TgUploader:
@@ -19,28 +21,34 @@ class TgUploader:
         self.__start = time()
         self.__updater = time()
 
+    async def __send(self, client, path):
+        self.__client = client
+        if Var.AS_DOC:
+            return await client.send_document(chat_id=Var.FILE_STORE,
+                document=path,
+                thumb="thumb.jpg" if ospath.exists("thumb.jpg") else None,
+                caption=f"<i>{self.__name}</i>",
+                force_document=True,
+                progress=self.progress_status
+            )
+        else:
+            return await client.send_video(chat_id=Var.FILE_STORE,
+                video=path,
+                thumb="thumb.jpg" if ospath.exists("thumb.jpg") else None,
+                caption=f"<i>{self.__name}</i>",
+                progress=self.progress_status
+            )
+
     async def upload(self, path, qual):
         self.__name = ospath.basename(path)
         self.__qual = qual
         try:
-            if Var.AS_DOC:
-                return await self.__client.send_document(chat_id=Var.FILE_STORE,
-                    document=path,
-                    thumb="thumb.jpg" if ospath.exists("thumb.jpg") else None,
-                    caption=f"<i>{self.__name}</i>",
-                    force_document=True,
-                    progress=self.progress_status
-                )
-            else:
-                return await self.__client.send_video(chat_id=Var.FILE_STORE,
-                    document=path,
-                    thumb="thumb.jpg" if ospath.exists("thumb.jpg") else None,
-                    caption=f"<i>{self.__name}</i>",
-                    progress=self.progress_status
-                )
-        except FloodWait as e:
-            sleep(e.value * 1.5)
-            return await upload(path, qual, thumbnail)
+            # The pool retries a FloodWait on another session without blocking the loop
+            msg, session = await uppool.upload(partial(self.__send, path=path))
+            if session.is_main:
+                # file_ids are per bot, worker ones would not be valid for deliveries
+                delivery.add(msg)
+            return msg
         except Exception as e:
             await rep.report(format_exc(), "error")
             raise e
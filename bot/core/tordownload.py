@@ -1,70 +1,187 @@
-import asyncio
-import subprocess
+from asyncio import Event, sleep as asleep
+from math import floor
+from time import time
 from os import path as ospath
 from aiofiles import open as aiopen
 from aiofiles.os import path as aiopath, remove as aioremove, mkdir
 from aiohttp import ClientSession
-from bot import LOGS
-from bot.core.func_utils import handle_logs
+from bot import Var, LOGS
+from bot.core.func_utils import handle_logs, editMessage, convertBytes, convertTime
+from bot.core.aria2 import aria2
+from bot.core.torrent_meta import TorrentMeta, TorrentFile, magnet_hash
+from bot.core.streaming import TorrentStream
 
 class TorDownloader:
-    def __init__(self, path="."):
+    def __init__(self, path=".", message=None, stream=False):
         self.__downdir = path
         self.__torpath = "torrents/"
+        self.__message = message
+        self.__gid = None
+        self.__cancelled = False
+        self.__start = time()
+        self.__updater = 0
+        self.__streaming = stream
+        self.__stream_ready = Event()
+        self.__stream_start = 0
+        self.stream = None
 
     @handle_logs
-    async def download(self, torrent: str, name: str = None) -> str:
+    async def download(self, torrent: str, name: str = None) -> TorrentFile:
         """
-        Downloads a torrent or magnet link using aria2c.
+        Resolves the torrent metadata, then downloads only its main video file using aria2.
         :param torrent: Magnet link or URL to a .torrent file
         :param name: Optional filename override
-        :return: Path to the downloaded file or None if failed
+        :return: TorrentFile of the downloaded video or None if failed
         """
-        if torrent.startswith("magnet:"):
-            return await self._download_with_aria2(torrent, name)
-        
-        elif torfile := await self.get_torfile(torrent):
+        try:
+            if torrent.startswith("magnet:"):
+                torfile = await self.get_magnet_meta(torrent)
+            else:
+                torfile = await self.get_torfile(torrent)
+
+            if not torfile:
+                LOGS.error("Failed to retrieve torrent metadata. Possible invalid magnet link.")
+                return None
             return await self._download_with_aria2(torfile, name)
-        
-        else:
-            LOGS.error("Failed to retrieve torrent metadata. Possible invalid magnet link.")
+        finally:
+            if self.stream and not self.stream.complete:
+                self.stream.failed = True
+            self.__stream_ready.set()
+
+    async def wait_stream(self):
+        """Waits until the head of a streamable download is on disk, None if the download is not streamable."""
+        await self.__stream_ready.wait()
+        return self.stream
+
+    async def __wait(self, name):
+        finished = False
+        try:
+            while True:
+                await asleep(3)
+                if self.__cancelled:
+                    LOGS.info(f"Download cancelled: {name}")
+                    return None
+                status = await aria2.status(self.__gid)
+                if self.stream:
+                    await self.stream.follow(status)
+                    self.__check_stream()
+                if (state := status.get('status')) == "complete":
+                    finished = True
+                    if self.stream:
+                        self.stream.complete = True
+                    await aria2.call("removeDownloadResult", self.__gid)
+                    return status
+                if state in ("error", "removed"):
+                    LOGS.error(f"aria2c failed: {status.get('errorMessage') or state}")
+                    return None
+                await self.progress_status(status, name)
+        finally:
+            # Cancelled, failed or errored out, the daemon must not keep the GID running
+            if not finished:
+                await aria2.remove(self.__gid)
+
+    def __check_stream(self):
+        if self.__stream_ready.is_set():
+            return
+        if self.stream.frontier:
+            LOGS.info(f"Stream Ready : {ospath.basename(self.stream.path)}")
+            self.__stream_ready.set()
+        elif time() - self.__stream_start > Var.STREAM_STALL:
+            LOGS.warning(f"Stream Head did not Arrive in {Var.STREAM_STALL}s, Encoding after Download")
+            self.stream = None
+            self.__stream_ready.set()
+
+    @handle_logs
+    async def get_magnet_meta(self, magnet: str) -> str:
+        """
+        Fetches only the metadata of a magnet link and saves it as a .torrent file.
+        :param magnet: Magnet link
+        :return: Path to the saved torrent file
+        """
+        if not await aiopath.isdir(self.__torpath):
+            await mkdir(self.__torpath)
+        if (info_hash := magnet_hash(magnet)) and await aiopath.exists(torfile := ospath.join(self.__torpath, f"{info_hash}.torrent")):
+            # Saved before a restart, the daemon may even hold the download already and would reject the magnet
+            return torfile
+        self.__gid = await aria2.add_uri(magnet, {'dir': ospath.abspath(self.__torpath), 'bt-metadata-only': 'true', 'bt-save-metadata': 'true'})
+        if not (status := await self.__wait(magnet)) or not (info_hash := status.get('infoHash')):
             return None
+        torfile = ospath.join(self.__torpath, f"{info_hash}.torrent")
+        return torfile if await aiopath.exists(torfile) else None
 
     @handle_logs
-    async def _download_with_aria2(self, source: str, name: str = None) -> str:
+    async def _download_with_aria2(self, source: str, name: str = None) -> TorrentFile:
         """
-        Uses aria2c to download the torrent.
-        :param source: Magnet link or torrent file path
+        Submits the main video file of a torrent to the aria2 RPC daemon and follows it until it finishes.
+        :param source: Torrent file path
         :param name: Optional filename override
-        :return: Path to the downloaded file
+        :return: TorrentFile of the downloaded video
         """
-        LOGS.info(f"Starting download using aria2: {source}")
-        command = [
-            "aria2c",
-            "--dir=" + self.__downdir,
-            "--seed-time=0",
-            "--max-connection-per-server=16",
-            "--split=16",
-            "--bt-max-peers=500",
-            "--bt-tracker-connect-timeout=5",
-            "--bt-tracker-timeout=5",
-            "--bt-tracker=udp://tracker.openbittorrent.com:80/announce",
-            "--summary-interval=5",
-            "--continue=true",
-            source,
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            LOGS.info(f"Download completed: {name if name else source}")
-            return self.__downdir
+        meta = TorrentMeta.from_file(source)
+        if not (main := meta.main_file()):
+            LOGS.error(f"No Video File Found in Torrent: {meta.name}")
+            return None
+        index, rel_path, length = main
+        LOGS.info(f"Starting download using aria2: {meta.name} [{index}/{len(meta.files)}] {rel_path}")
+        options = {'dir': ospath.abspath(self.__downdir), 'select-file': str(index)}
+        streaming = self.__streaming and TorrentStream.supported(rel_path)
+        if streaming:
+            # aria2 has no sequential BitTorrent mode, the stream keeps sliding this prioritized head forward
+            options['bt-prioritize-piece'] = f"head={Var.STREAM_HEAD}"
+        held = await aria2.find(meta.info_hash)
+        if held and held.get('dir') == options['dir'] and held.get('status') not in ("error", "removed"):
+            # A daemon that outlived a restart still runs this job's torrent and rejects a second add
+            LOGS.info(f"Re-attached to aria2 Download: {meta.name} [{held['gid']}]")
+            self.__gid = held['gid']
+        elif held and held.get('dir') != options['dir'] and held.get('status') in ("active", "waiting", "paused"):
+            # Owned by another job's workspace, sharing it would let either job remove or delete the other's file
+            LOGS.error(f"Torrent Already Downloading in Another Task: {meta.name}")
+            return None
         else:
-            LOGS.error(f"aria2c failed: {stderr.decode().strip()}")
+            if held and held.get('dir') == options['dir']:
+                await aria2.remove(held['gid'])
+            self.__gid = await aria2.add_torrent(source, options)
+        if streaming:
+            self.stream = TorrentStream(self.__gid, ospath.join(ospath.abspath(self.__downdir), rel_path), meta.offset(index), length)
+            self.__stream_start = time()
+        else:
+            self.__stream_ready.set()
+
+        if not (status := await self.__wait(name or meta.name)):
             return None
+        path = next((f['path'] for f in status.get('files', []) if f.get('index') == str(index)), None) \
+            or ospath.join(self.__downdir, rel_path)
+        LOGS.info(f"Download completed: {name if name else meta.name}")
+        return TorrentFile(path, meta.info_hash, length, index)
+
+    async def progress_status(self, status, name):
+        now = time()
+        if not self.__message or (now - self.__updater) < 7:
+            return
+        if self.stream and self.__stream_ready.is_set():
+            # The streaming encoder owns the status message now
+            return
+        self.__updater = now
+        total, current = int(status.get('totalLength', 0)), int(status.get('completedLength', 0))
+        speed = int(status.get('downloadSpeed', 0))
+        percent = round(current / total * 100, 2) if total else 0
+        eta = (total - current) / speed if speed else 0
+        bar = floor(percent/8)*"█" + (12 - floor(percent/8))*"▒"
+        progress_str = f"""‣ <b>Anime Name :</b> <b><i>{name}</i></b>
+
+‣ <b>Status :</b> <i>Downloading</i>
+    <code>[{bar}]</code> {percent}%
+    
+    ‣ <b>Size :</b> {convertBytes(current)} out of ~ {convertBytes(total)}
+    ‣ <b>Speed :</b> {convertBytes(speed)}/s
+    ‣ <b>Peers :</b> {status.get('numSeeders', 0)} Seeder(s), {status.get('connections', 0)} Connection(s)
+    ‣ <b>Time Took :</b> {convertTime(now - self.__start)}
+    ‣ <b>Time Left :</b> {convertTime(eta)}"""
+        await editMessage(self.__message, progress_str)
+
+    async def cancel(self):
+        """Stops a running download, its GID is removed from the daemon within one status poll."""
+        self.__cancelled = True
 
     @handle_logs
     async def get_torfile(self, url: str) -> str:
@@ -0,0 +1,90 @@
+from re import search
+from base64 import b32decode
+from hashlib import sha1
+from os import path as ospath
+
+VIDEO_EXTS = ('.mkv', '.mp4', '.avi', '.webm', '.mov', '.ts', '.m4v')
+
+class BencodeError(ValueError):
+    pass
+
+def bdecode(data, idx=0):
+    """Decodes one bencoded value at idx, returns (value, next index)."""
+    try:
+        tok = data[idx:idx+1]
+        if tok == b'i':
+            end = data.index(b'e', idx)
+            return int(data[idx+1:end]), end + 1
+        if tok == b'l':
+            idx, items = idx + 1, []
+            while data[idx:idx+1] != b'e':
+                item, idx = bdecode(data, idx)
+                items.append(item)
+            return items, idx + 1
+        if tok == b'd':
+            idx, items = idx + 1, {}
+            while data[idx:idx+1] != b'e':
+                key, idx = bdecode(data, idx)
+                start = idx
+                items[key], idx = bdecode(data, idx)
+                if key == b'info':
+                    items[b'__info_span__'] = (start, idx)
+            return items, idx + 1
+        if tok.isdigit():
+            colon = data.index(b':', idx)
+            end = colon + 1 + int(data[idx:colon])
+            return data[colon+1:end], end
+    except (IndexError, ValueError) as e:
+        raise BencodeError(str(e)) from e
+    raise BencodeError(f"Invalid Token at {idx}")
+
+def magnet_hash(magnet):
+    """Hex info-hash of a magnet link, None if it has no btih."""
+    if not (m := search(r"xt=urn:btih:([0-9A-Za-z]+)", magnet)):
+        return None
+    if len(btih := m.group(1)) == 32:
+        return b32decode(btih.upper()).hex()
+    return btih.lower() if len(btih) == 40 else None
+
+def _text(value):
+    return value.decode(errors='replace') if isinstance(value, bytes) else str(value)
+
+class TorrentMeta:
+    def __init__(self, data):
+        meta, _ = bdecode(data)
+        if not isinstance(meta, dict) or b'info' not in meta:
+            raise BencodeError("Missing Info Dictionary")
+        start, end = meta[b'__info_span__']
+        info = meta[b'info']
+        self.info_hash = sha1(data[start:end]).hexdigest()
+        self.name = _text(info.get(b'name.utf-8') or info.get(b'name', b''))
+        if b'files' in info:
+            self.files = [(n, ospath.join(self.name, *(_text(p) for p in (f.get(b'path.utf-8') or f[b'path']))), f[b'length'])
+                          for n, f in enumerate(info[b'files'], start=1)]
+        else:
+            self.files = [(1, self.name, info.get(b'length', 0))]
+        self.size = sum(length for _, _, length in self.files)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def main_file(self):
+        """Largest video file of the torrent as (index, relative path, length), None if there is no video."""
+        videos = [f for f in self.files if f[1].lower().endswith(VIDEO_EXTS)]
+        return max(videos, key=lambda f: f[2]) if videos else None
+
+    def offset(self, index):
+        """Byte offset of a file inside the torrent's concatenated piece space."""
+        return sum(length for n, _, length in self.files if n < index)
+
+class TorrentFile:
+    def __init__(self, path, info_hash, size, index=None):
+        self.path = path
+        self.info_hash = info_hash
+        self.size = size
+        self.index = index
+
+    def __repr__(self):
+        return f"TorrentFile({self.path!r}, {self.info_hash}, {self.size})"
@@ -0,0 +1,72 @@
+from time import time
+from asyncio import sleep as asleep
+from pyrogram import Client
+from pyrogram.enums import ParseMode
+from pyrogram.errors import FloodWait
+
+from bot import bot, Var, LOGS
+
+class UploadSession:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.active = 0
+        self.blocked_until = 0
+
+    @property
+    def is_main(self):
+        return self.client is bot
+
+class UploadPool:
+    """Spreads uploads over the bot and UPLOAD_TOKENS worker sessions, each with its own FloodWait state."""
+    def __init__(self, tokens):
+        self.__tokens = tokens
+        self.__sessions = [UploadSession(bot, "main")]
+
+    @property
+    def size(self):
+        return len(self.__sessions)
+
+    async def start(self):
+        for n, token in enumerate(self.__tokens, start=1):
+            client = Client(name=f"AutoAniUploader{n}", api_id=Var.API_ID, api_hash=Var.API_HASH, bot_token=token,
+                            in_memory=True, no_updates=True, parse_mode=ParseMode.HTML)
+            try:
+                await client.start()
+            except Exception as e:
+                LOGS.error(f"Upload Session {n} Failed to Start : {e}")
+                continue
+            self.__sessions.append(UploadSession(client, f"worker{n}"))
+        LOGS.info(f"Upload Pool Started : {len(self.__sessions)} Session(s)")
+
+    async def stop(self):
+        for session in self.__sessions:
+            if not session.is_main:
+                try:
+                    await session.client.stop()
+                except Exception as e:
+                    LOGS.error(str(e))
+
+    async def __acquire(self):
+        """Least loaded session that is not in a FloodWait, waiting for the earliest one to recover otherwise."""
+        while True:
+            now = time()
+            if ready := [s for s in self.__sessions if s.blocked_until <= now]:
+                session = min(ready, key=lambda s: s.active)
+                session.active += 1
+                return session
+            await asleep(min(s.blocked_until for s in self.__sessions) - now)
+
+    async def upload(self, func):
+        """Runs func(client) on a pooled session and returns (result, session) as soon as it finishes."""
+        while True:
+            session = await self.__acquire()
+            try:
+                return await func(session.client), session
+            except FloodWait as f:
+                LOGS.warning(f"Upload Session {session.name} FloodWait of {f.value}s, Retrying on Another Session")
+                session.blocked_until = time() + f.value * 1.2
+            finally:
+                session.active -= 1
+
+uppool = UploadPool(Var.UPLOAD_TOKENS)
@@ -0,0 +1,54 @@
+from os import path as ospath, makedirs, link, symlink, walk
+from aioshutil import rmtree as aiormtree
+
+from bot import LOGS
+from .torrent_meta import VIDEO_EXTS
+
+class JobWorkspace:
+    def __init__(self, job_id):
+        self.job_id = str(job_id)
+        self.path = ospath.join("encode", self.job_id)
+        self.dl_dir = ospath.join("downloads", self.job_id)
+        self.source = None
+        makedirs(self.path, exist_ok=True)
+        makedirs(self.dl_dir, exist_ok=True)
+
+    def set_source(self, path):
+        """Registers the downloaded file, picking the largest video if a directory is given."""
+        if path and ospath.isdir(path):
+            files = [ospath.join(root, f) for root, _, names in walk(path) for f in names if f.lower().endswith(VIDEO_EXTS)]
+            path = max(files, key=ospath.getsize) if files else None
+        self.source = path
+        return path
+
+    def qual_dir(self, qual):
+        qdir = ospath.join(self.path, str(qual))
+        makedirs(qdir, exist_ok=True)
+        return qdir
+
+    def tmp_out(self, qual):
+        return ospath.join(self.qual_dir(qual), "out.mkv")
+
+    def out_path(self, qual, name):
+        return ospath.join(self.qual_dir(qual), name)
+
+    def link_input(self):
+        """Exposes the source under a shell-safe name inside the workspace, via hardlink or symlink, never a rename."""
+        in_path = ospath.join(self.path, "in" + (ospath.splitext(self.source)[1] or ".mkv"))
+        if ospath.lexists(in_path):
+            return in_path
+        try:
+            link(self.source, in_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            symlink(ospath.abspath(self.source), in_path)
+        return in_path
+
+    async def cleanup(self):
+        for wdir in (self.path, self.dl_dir):
+            if ospath.isdir(wdir):
+                try:
+                    await aiormtree(wdir)
+                except Exception as e:
+                    LOGS.error(str(e))
@@ -1,13 +1,19 @@
 from asyncio import sleep as asleep, gather
-from pyrogram.filters import command, private, user
+from os import path as ospath
+from pyrogram.filters import command, private
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from pyrogram.errors import FloodWait, MessageNotModified
 
 from bot import bot, bot_loop, Var, ani_cache
 from bot.core.database import db
-from bot.core.func_utils import decode, is_fsubbed, get_fsubs, editMessage, sendMessage, new_task, convertTime, getfeed
+from bot.core.func_utils import admins, fsub_chats, decode, is_fsubbed, get_fsubs, editMessage, sendMessage, new_task, convertTime, getfeed
 from bot.core.auto_animes import get_animes
+from bot.core.delivery import delivery
+from bot.core.fsub import fsubs
+from bot.core.auto_delete import autodel
 from bot.core.reporter import rep
+from bot.core.benchmark import ProfileBenchmark, save_tuned
+from bot.core.refresh import refresh
 
 @bot.on_message(command('start') & private)
 @new_task
@@ -15,8 +21,8 @@ async def start_msg(client, message):
     uid = message.from_user.id
     from_user = message.from_user
     txtargs = message.text.split()
-    temp = await sendMessage(message, "<i>Connecting..</i>")
-    if not await is_fsubbed(uid):
+    temp, fsubbed = await gather(sendMessage(message, "<i>Connecting..</i>"), is_fsubbed(uid))
+    if not fsubbed:
         txt, btns = await get_fsubs(uid, txtargs)
         return await editMessage(temp, txt, InlineKeyboardMarkup(btns))
     if len(txtargs) <= 1:
@@ -58,39 +64,39 @@ async def start_msg(client, message):
             await editMessage(temp, "<b>Input Link Code is Invalid !</b>")
             return
         try:
-            msg = await client.get_messages(Var.FILE_STORE, message_ids=fid)
-            if msg.empty:
+            if not (nmsg := await delivery.deliver(client, message.chat.id, fid)):
                 return await editMessage(temp, "<b>File Not Found !</b>")
-            nmsg = await msg.copy(message.chat.id, reply_markup=None)
             await temp.delete()
             if Var.AUTO_DEL:
-                async def auto_del(msg, timer):
-                    await asleep(timer)
-                    await msg.delete()
+                autodel.schedule(nmsg.chat.id, nmsg.id, Var.DEL_TIMER)
                 await sendMessage(message, f'<i>File will be Auto Deleted in {convertTime(Var.DEL_TIMER)}, Forward to Saved Messages Now..</i>')
-                bot_loop.create_task(auto_del(nmsg, Var.DEL_TIMER))
         except Exception as e:
             await rep.report(f"User : {uid} | Error : {str(e)}", "error")
             await editMessage(temp, "<b>File Not Found !</b>")
     else:
         await editMessage(temp, "<b>Input Link is Invalid for Usage !</b>")
     
-@bot.on_message(command('pause') & private & user(Var.ADMINS))
+@bot.on_chat_member_updated(fsub_chats)
+async def fsub_update(client, update):
+    if member := (update.old_chat_member or update.new_chat_member):
+        fsubs.invalidate(member.user.id, update.chat.id)
+    
+@bot.on_message(command('pause') & private & admins)
 async def pause_fetch(client, message):
     ani_cache['fetch_animes'] = False
     await sendMessage(message, "`Successfully Paused Fetching Animes...`")
 
-@bot.on_message(command('resume') & private & user(Var.ADMINS))
+@bot.on_message(command('resume') & private & admins)
 async def pause_fetch(client, message):
     ani_cache['fetch_animes'] = True
     await sendMessage(message, "`Successfully Resumed Fetching Animes...`")
 
-@bot.on_message(command('log') & private & user(Var.ADMINS))
+@bot.on_message(command('log') & private & admins)
 @new_task
 async def _log(client, message):
     await message.reply_document("log.txt", quote=True)
 
-@bot.on_message(command('addlink') & private & user(Var.ADMINS))
+@bot.on_message(command('addlink') & private & admins)
 @new_task
 async def add_task(client, message):
     if len(args := message.text.split()) <= 1:
@@ -99,7 +105,7 @@ async def add_task(client, message):
     Var.RSS_ITEMS.append(args[0])
     req_msg = await sendMessage(message, f"`Global Link Added Successfully!`\n\n    • **All Link(s) :** {', '.join(Var.RSS_ITEMS)[:-2]}")
 
-@bot.on_message(command('addtask') & private & user(Var.ADMINS))
+@bot.on_message(command('addtask') & private & admins)
 @new_task
 async def add_task(client, message):
     if len(args := message.text.split()) <= 1:
@@ -111,3 +117,29 @@ async def add_task(client, message):
     
     ani_task = bot_loop.create_task(get_animes(taskInfo.title, taskInfo.link, True))
     await sendMessage(message, f"<i><b>Task Added Successfully!</b></i>\n\n    • <b>Task Name :</b> {taskInfo.title}\n    • <b>Task Link :</b> {args[1]}")
+
+@bot.on_message(command('benchmark') & private & admins)
+@new_task
+async def benchmark(client, message):
+    args = message.text.split()[1:]
+    apply = 'apply' in args
+    quals = [arg for arg in args if arg in Var.QUALS] or Var.QUALS
+    sample = next((arg for arg in args if ospath.isfile(arg)), None)
+    stat_msg = await sendMessage(message, f"<i>Benchmarking Encoder Profiles for {', '.join(quals)}...</i>")
+    bench = ProfileBenchmark(quals, sample)
+    best = await bench.run()
+    if apply and best:
+        await save_tuned(best)
+    await editMessage(stat_msg, bench.summary(best) + ("\n<i>Tuned Profiles Saved & Applied !</i>" if apply and best else "\n<i>Use /benchmark apply to Save these Profiles</i>"))
+
+@bot.on_message(command('reload') & private & admins)
+@new_task
+async def reload_config(client, message):
+    try:
+        changed, pending = await refresh()
+    except Exception as e:
+        return await sendMessage(message, f"<b>Reload Failed :</b> <code>{e}</code>")
+    txt = f"<i><b>Config Reloaded Successfully!</b></i>\n\n    • <b>Changed :</b> {', '.join(changed) or 'Nothing'}"
+    if pending:
+        txt += f"\n    • <b>Needs /restart :</b> {', '.join(pending)}"
+    await sendMessage(message, txt)
@@ -1,36 +1,16 @@
-from json import loads as jloads
-from os import path as ospath, execl
-from sys import executable
-
-from aiohttp import ClientSession
-from bot import Var, bot, ffQueue
-from bot.core.text_utils import TextEditor
+from bot import Var
+from bot.core.schedule import shdr
+from bot.core.refresh import refresh
 from bot.core.reporter import rep
 
 async def upcoming_animes():
     if Var.SEND_SCHEDULE:
         try:
-            async with ClientSession() as ses:
-                res = await ses.get("https://subsplease.org/api/?f=schedule&h=true&tz=Asia/Kolkata")
-                aniContent = jloads(await res.text())["schedule"]
-            text = "<b>📆 Today's Anime Releases Schedule [IST]</b>\n\n"
-            for i in aniContent:
-                aname = TextEditor(i["title"])
-                await aname.load_anilist()
-                text += f''' <a href="https://subsplease.org/shows/{i['page']}">{aname.adata.get('title', {}).get('english') or i['title']}</a>\n    • <b>Time</b> : {i["time"]} hrs\n\n'''
-            TD_SCHR = await bot.send_message(Var.MAIN_CHANNEL, text)
-            await (await TD_SCHR.pin()).delete()
+            await shdr.post()
         except Exception as err:
             await rep.report(str(err), "error")
-    if not ffQueue.empty():
-        await ffQueue.join()
-    await rep.report("Auto Restarting..!!", "info")
-    execl(executable, executable, "-m", "bot")
-
-async def update_shdr(name, link):
-    if TD_SCHR is not None:
-        TD_lines = TD_SCHR.text.split('\n')
-        for i, line in enumerate(TD_lines):
-            if line.startswith(f"📌 {name}"):
-                TD_lines[i+2] = f"    • **Status :** ✅ __Uploaded__\n    • **Link :** {link}"
-        await TD_SCHR.edit("\n".join(TD_lines))
+    try:
+        changed, pending = await refresh()
+        await rep.report(f"Daily Refresh Done, Changed : {', '.join(changed) or 'Nothing'}" + (f"\nNeeds /restart : {', '.join(pending)}" if pending else ""), "info")
+    except Exception as err:
+        await rep.report(f"Daily Refresh Failed : {err}", "error")